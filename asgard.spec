@@ -5,7 +5,7 @@ block_cipher = None
 
 a = Analysis(['bin/asgard'],
              pathex=['.'],
-             hiddenimports=[],
+             hiddenimports=['asgard.batch', 'asgard.daemon', 'asgard.client', 'asgard.checkmsg', 'asgard.timeline', 'asgard.lint'],
              hookspath=[],
              runtime_hooks=[],
              excludes=[],
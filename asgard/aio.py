@@ -0,0 +1,180 @@
+"""asyncio counterparts of GitRepo and version inference.
+
+For services inferring versions for many repos on one event loop: git runs
+through asyncio subprocesses, history is streamed, and the number of git
+processes running at once is capped by a semaphore shared between repos.
+Cancelling a task kills the git process it was waiting on.
+"""
+
+import asyncio
+import os
+import weakref
+
+from asgard.app import bump_version, needs_bump, next_bump
+from asgard.git import TAGS_FORMAT, GitRepo, find_git_dir
+from asgard.tags import TagIndex
+
+# Git processes running at once per event loop, unless a semaphore is given.
+MAX_GIT_PROCESSES = 32
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def default_semaphore():
+    """Returns the running event loop's shared semaphore."""
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(MAX_GIT_PROCESSES)
+    return _semaphores[loop]
+
+
+class AsyncGitRepo:
+    """Read-only, asyncio-based access to an existing git repo.
+
+    semaphore caps how many git processes run at once; repos share the
+    event loop's default one unless given their own.
+    """
+
+    chunk_size = 65536
+
+    def __init__(self, repo_path, semaphore=None):
+        if not os.path.isdir(repo_path):
+            raise FileNotFoundError(f"No such directory: {repo_path}")
+        find_git_dir(repo_path)
+        self.repo_path = repo_path
+        self.semaphore = semaphore
+
+    def _semaphore(self):
+        if self.semaphore is None:
+            self.semaphore = default_semaphore()
+        return self.semaphore
+
+    async def _spawn(self, args):
+        return await asyncio.create_subprocess_exec(
+            "git",
+            *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            cwd=self.repo_path,
+        )
+
+    @staticmethod
+    async def _stop(proc):
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+
+    async def git(self, *args):
+        """Runs git with args, returning its stdout (bytes) if it succeeded."""
+        async with self._semaphore():
+            proc = await self._spawn(args)
+            try:
+                stdout, _ = await proc.communicate()
+            finally:
+                await self._stop(proc)
+        if proc.returncode != 0:
+            raise RuntimeError(f"git {args[0]} failed in {self.repo_path}")
+        return stdout
+
+    async def _stream(self, args):
+        """Yields git's stdout in chunks as they arrive."""
+        async with self._semaphore():
+            proc = await self._spawn(args)
+            try:
+                while True:
+                    chunk = await proc.stdout.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                await self._stop(proc)
+
+    async def tags(self):
+        """Returns (commit hash, tag name) pairs for all tags, peeled."""
+        out = await self.git("for-each-ref", f"--format={TAGS_FORMAT}", "refs/tags")
+        return GitRepo._parse_tags(out)
+
+    async def tag_index(self, prefix=""):
+        return TagIndex(await self.tags(), prefix)
+
+    async def latest_tag(self, index=None):
+        """Returns (hash, tag) for the newest semver tag reachable from HEAD."""
+        index = await self.tag_index() if index is None else index
+        if not index:
+            return None
+        lines = self._stream(["log", "--format=%H"])
+        pending = b""
+        try:
+            async for chunk in lines:
+                *hashes, pending = (pending + chunk).split(b"\n")
+                for commit_hash in hashes:
+                    commit_hash = commit_hash.decode()
+                    if commit_hash in index:
+                        return commit_hash, index.tag(commit_hash)
+        finally:
+            await lines.aclose()
+        return None
+
+    async def iter_log(self, exclude=None, index=None):
+        """Yields commit records newest first, like GitRepo.iter_log."""
+        index = await self.tag_index() if index is None else index
+        args = ["log", "-z", "--format=%x01%H%x00%B"]
+        args.append(f"{exclude}..HEAD" if exclude else "HEAD")
+        chunks = self._stream(args)
+        pending = b""
+        try:
+            async for chunk in chunks:
+                # Records start with \x01; the first one has no NUL before it.
+                records = (pending + chunk).split(b"\0\x01")
+                pending = records.pop()
+                for record in records:
+                    yield GitRepo._parse_record(record.lstrip(b"\x01"), index)
+            if pending:
+                yield GitRepo._parse_record(pending.lstrip(b"\x01"), index)
+        finally:
+            await chunks.aclose()
+
+
+async def bump_level_async(commits, cache=None):
+    """bump_level for an async iterable of commits."""
+    bump = "micro"
+    async for commit in commits:
+        bump = next_bump(bump, commit, cache)
+        if bump == "major":
+            break
+    return bump
+
+
+async def infer_vnext_async(
+    repo, suffix="", suffix_dot_suffix=False, suffix_dash_prefix=False, cache=None
+):
+    """Infers the next version of a repo (an AsyncGitRepo or a path).
+
+    Starts from the most recent tag in history, reading only the commits made
+    since, and only until the bump is settled.
+    """
+    if not isinstance(repo, AsyncGitRepo):
+        repo = AsyncGitRepo(repo)
+    index = await repo.tag_index()
+    latest = await repo.latest_tag(index)
+    pending = repo.iter_log(exclude=latest[0] if latest else None, index=index)
+    try:
+        if latest is None:
+            empty = True
+            async for _ in pending:
+                empty = False
+                break
+            if empty:
+                raise ValueError(f"No commits found in git repo at {repo.repo_path}.")
+        bump = "micro"
+        tag = latest[1] if latest else None
+        if needs_bump(tag, suffix, suffix_dot_suffix, suffix_dash_prefix):
+            bump = await bump_level_async(pending, cache)
+    finally:
+        await pending.aclose()
+    return bump_version(
+        tag,
+        bump,
+        suffix=suffix,
+        suffix_dot_suffix=suffix_dot_suffix,
+        suffix_dash_prefix=suffix_dash_prefix,
+    )
@@ -1,43 +1,361 @@
 """Entrypoint and core functions."""
 
 import argparse
+import cProfile
+import importlib
+import json
 import os
 import sys
 
+from asgard import stats
 from asgard._version import __version__
-from asgard.git import GitRepo
+from asgard.cache import ClassificationCache
+from asgard.changelog import Changelog
+from asgard.git import GitRepo, NativeGitRepo
+from asgard.notes import VersionNotes
+from asgard.records import Commit
 from asgard.semver import SemVer
+from asgard.tags import TagIndex
 from asgard.conventionalcommits import ConventionalCommitMsg
 
+# Commits fetched by the first deepening of a shallow clone (then doubled).
+DEEPEN_STEP = 50
+BUMPS = ("micro", "minor", "major")
+
+COMMANDS = {
+    "batch": "asgard.batch",
+    "check-msg": "asgard.checkmsg",
+    "lint": "asgard.lint",
+    "serve": "asgard.daemon",
+    "query": "asgard.client",
+    "timeline": "asgard.timeline",
+}
+
 
 def main(args=sys.argv[1:]):
+    if args and args[0] in COMMANDS:
+        return importlib.import_module(COMMANDS[args[0]]).main(args[1:])
+
     a = parse_args(args)
 
     if a.version:
         print(__version__)
         sys.exit(0)
 
-    g = GitRepo(a.repo_path)
+    collected = stats.start() if a.stats else None
+    profile = cProfile.Profile() if a.profile else None
+    try:
+        if profile is not None:
+            profile.enable()
+        with stats.phase("open"):
+            g = open_repo(a.repo_path, a.backend, a.read_only)
+            cache = open_cache(g) if a.cache else None
+        with g:
+            if a.packages:
+                release_packages(g, a, cache)
+            else:
+                print(release(g, a, cache, changelog=a.changelog))
+    finally:
+        if profile is not None:
+            profile.disable()
+            profile.dump_stats(a.profile)
+        if collected is not None:
+            stats.stop()
+            write_stats(collected, a.stats)
 
-    if len(g.log()) == 0:
-        raise ValueError(f"No commits found in git repo at {a.repo_path}.")
 
-    vnext = infer_vnext(
-        g.log(),
-        suffix=a.prerelease_suffix,
-        suffix_dash_prefix=a.suffix_dash_prefix,
-        suffix_dot_suffix=a.suffix_dot_suffix,
-    )
-    print(vnext)
-    if a.commit:
-        g.commit(f"release: {vnext}", allow_empty=True)
-    if a.tag:
-        g.tag(f"v{vnext}")
+def write_stats(collected, path):
+    report = json.dumps(collected.as_dict(), indent=2)
+    if path == "-":
+        print(report, file=sys.stderr)
+    else:
+        with open(path, "w") as f:
+            print(report, file=f)
+
+
+def open_repo(repo_path, backend="git", read_only=False):
+    if backend == "native":
+        return NativeGitRepo(repo_path, read_only)
+    return GitRepo(repo_path, read_only)
+
+
+def open_cache(g):
+    return ClassificationCache(os.path.join(g.git_dir(), "asgard", "cache"))
+
+
+def release(g, a, cache=None, changelog=None):
+    """Infers the next version and makes the release commit and tag a asks for.
+
+    With changelog (a path), the release's notes are prepended to that file,
+    which the release commit then includes. With a.notes, the version state
+    noted on the nearest commit since the release tag saves classifying the
+    history before it, and HEAD's state is noted in turn.
+    """
+    state = None
+    if a.notes or a.notes_remote:
+        state = VersionNotes(g)
+        if a.notes_remote and not g.read_only:
+            with stats.phase("notes"):
+                state.fetch(a.notes_remote)
+    with stats.phase("tags"):
+        index, latest = select_tag(g, a)
+    if latest is None and not a.no_deepen:
+        with stats.phase("deepen"):
+            index, latest = deepen_until(g, lambda: select_tag(g, a), DEEPEN_STEP)
+    exclude = latest[0] if latest else None
+    first_parent = a.traversal != "all"
+    resumed = None
+    if state is not None and latest is not None and not changelog:
+        with stats.phase("notes"):
+            since = g.iter_hashes(exclude=exclude, first_parent=first_parent)
+            try:
+                resumed = state.find(since, latest[1], a.traversal)
+            finally:
+                since.close()
+        if resumed is not None:
+            exclude = resumed[0]
+    pending = g.iter_log(exclude=exclude, index=index, first_parent=first_parent)
+    if a.traversal == "merges":
+        pending = expand_merges(g, pending, index)
+    pending = stats.timed_iter("history", pending)
+    notes = None
+    if changelog:
+        notes = Changelog()
+        pending = notes.recording(pending)
+
+    def compute_bump():
+        level = resumed[1]["bump"] if resumed else "micro"
+        if level != "major":
+            level = max(level, bump_level(pending, cache), key=BUMPS.index)
+        return level
+
+    try:
+        if latest is None and next(pending, None) is None:
+            raise ValueError(f"No commits found in git repo at {g.repo_path}.")
+        with stats.phase("version"):
+            bump = None
+            if state is not None and latest is not None:
+                # Noted states need the bump even when the version doesn't.
+                bump = compute_bump()
+            vnext = bump_version(
+                latest[1] if latest else None,
+                bump or compute_bump,
+                suffix=a.prerelease_suffix,
+                suffix_dash_prefix=a.suffix_dash_prefix,
+                suffix_dot_suffix=a.suffix_dot_suffix,
+            )
+        if notes is not None:
+            with stats.phase("changelog"):
+                # Inference may stop early; the notes need the whole range.
+                for _ in pending:
+                    pass
+    finally:
+        pending.close()
+    with stats.phase("write"):
+        if cache is not None and not g.read_only:
+            cache.flush()
+        if state is not None and latest is not None and not g.read_only:
+            record_state(g, a, state, resumed, latest[1], bump, vnext)
+        if notes is not None:
+            notes.prepend_to(changelog, f"v{vnext}")
+            notes.close()
+        if a.commit:
+            if changelog:
+                g.add(os.path.abspath(changelog))
+            g.commit(f"release: {vnext}", allow_empty=True)
+        if a.tag:
+            g.tag(f"v{vnext}")
+    return vnext
+
+
+def record_state(g, a, state, resumed, tag, bump, vnext):
+    """Notes HEAD's version state, unless it's already noted as such."""
+    head = g.object_info("HEAD")[0]
+    new = {"tag": tag, "traversal": a.traversal, "bump": bump, "version": vnext}
+    new = {key: str(value) for key, value in new.items()}
+    if resumed is not None and resumed[0] == head:
+        if {key: resumed[1].get(key) for key in new} == new:
+            return
+    state.put(head, new)
+    if a.notes_remote:
+        state.push(a.notes_remote)
+
+
+def select_tag(g, a):
+    """Returns (tag index, (hash, tag) of the release to start from or None)."""
+    if a.tag_selection == "version":
+        index = g.tag_index(merged="HEAD")
+        return index, index.highest(a.prerelease_suffix or None)
+    index = g.tag_index()
+    return index, g.latest_tag(index, first_parent=a.traversal != "all")
+
+
+def expand_merges(g, commits, index=None):
+    """Yields first-parent commits, plus what merges brought in when needed.
+
+    A merge whose own message is Conventional Commits-compliant (as with
+    merges titled after their pull request) stands for its branch. Any other
+    merge, like git's default "Merge branch ...", is followed by the commits
+    it merged, so that breaking changes in them still count. Those are the
+    commits reachable from the merged parents but not the first one, which
+    descends from the release being built upon.
+    """
+    for commit in commits:
+        yield commit
+        try:
+            ConventionalCommitMsg(commit["message"])
+            continue
+        except ValueError:
+            pass
+        parents = g.parents(commit["hash"])
+        for parent in parents[1:]:
+            side = g.iter_log(head=parent, exclude=parents[0], index=index)
+            try:
+                yield from side
+            finally:
+                side.close()
+
+
+def deepen_until(g, find, step):
+    """Deepens a shallow clone until find() finds what it looks for.
+
+    find returns a tuple whose last item is None (or empty) while whatever it
+    looks for (e.g. a release tag) is still out of reach. History is fetched
+    step commits at a time, doubling the step each time, and the search stops
+    once the clone isn't shallow anymore, or if fetching fails (e.g. on an
+    offline runner).
+    """
+    found = find()
+    while not found[-1] and g.is_shallow():
+        if g.read_only:
+            print(
+                "WARNING: Not deepening shallow clone opened read-only; "
+                "history may be incomplete.",
+                file=sys.stderr,
+            )
+            break
+        try:
+            g.deepen(step)
+        except RuntimeError as e:
+            print(
+                f"WARNING: {e}; continuing with the history already fetched.",
+                file=sys.stderr,
+            )
+            break
+        step *= 2
+        found = find()
+    return found
+
+
+def release_packages(g, a, cache=None):
+    """Monorepo mode: one history walk, one next version per changed package."""
+    if not a.no_deepen:
+        with stats.phase("deepen"):
+            deepen_until(g, lambda: (all_packages_tagged(g, a.packages),), DEEPEN_STEP)
+    with stats.phase("history"):
+        log = g.log(paths=True)
+    if len(log) == 0:
+        raise ValueError(f"No commits found in git repo at {g.repo_path}.")
+    with stats.phase("tags"):
+        tags = g.tags()
+    with stats.phase("version"):
+        vnexts = infer_package_vnexts(
+            log,
+            a.packages,
+            tags,
+            suffix=a.prerelease_suffix,
+            suffix_dash_prefix=a.suffix_dash_prefix,
+            suffix_dot_suffix=a.suffix_dot_suffix,
+            cache=cache,
+        )
+    for name, vnext in vnexts.items():
+        print(f"{name} {vnext}")
+    with stats.phase("write"):
+        if cache is not None and not g.read_only:
+            cache.flush()
+        if a.commit and vnexts:
+            releases = ", ".join(f"{name} {vnext}" for name, vnext in vnexts.items())
+            g.commit(f"release: {releases}", allow_empty=True)
+        if a.tag:
+            for name, vnext in vnexts.items():
+                g.tag(f"{name}/v{vnext}")
+
+
+def all_packages_tagged(g, packages):
+    tags = g.tags(merged="HEAD")
+    return all(TagIndex(tags, prefix=f"{name}/") for name, _ in packages)
+
+
+def parse_package(spec):
+    """Parses a NAME=PATH package spec into (name, path)."""
+    name, sep, path = spec.partition("=")
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f"expected NAME=PATH, got '{spec}'")
+    return name, path.strip("/") or "."
 
 
 def parse_args(args):
     """Parses CLI right now (might add env var support later)."""
-    parser = argparse.ArgumentParser()
+    parser = argparse.ArgumentParser(
+        epilog=f"other commands: {', '.join(COMMANDS)} (see 'asgard COMMAND --help')"
+    )
+    add_release_args(parser)
+    parser.add_argument(
+        "--version",
+        action="store_true",
+        default=False,
+        help="print program version and exit",
+    )
+    parser.add_argument(
+        "--package",
+        dest="packages",
+        action="append",
+        type=parse_package,
+        metavar="NAME=PATH",
+        help="version the package at PATH separately, tagged as NAME/vX.Y.Z "
+        "(repeatable; prints 'NAME VERSION' for each package with unreleased commits)",
+    )
+    parser.add_argument(
+        "--repo-path", default=os.getcwd(), help="git repo path (defaults to '.')"
+    )
+    parser.add_argument(
+        "--changelog",
+        metavar="FILE",
+        help="prepend the release's notes, grouped by commit type, to FILE "
+        "(added to the release commit with --commit)",
+    )
+    parser.add_argument(
+        "--stats",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="report per-phase wall times, git processes spawned, bytes read from "
+        "git and commits examined as JSON, to FILE or stderr",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="write a cProfile dump to FILE (readable with pstats, snakeviz or "
+        "gprof2dot)",
+    )
+    a = parser.parse_args(args)
+    if a.packages:
+        # Package mode reads the whole history once and splits it by path.
+        unsupported = {
+            "--changelog": a.changelog,
+            "--notes": a.notes,
+            "--notes-remote": a.notes_remote,
+            "--traversal": a.traversal != "all",
+            "--tag-selection": a.tag_selection != "topology",
+        }
+        for option, given in unsupported.items():
+            if given:
+                parser.error(f"{option} isn't supported with --package")
+    return a
+
+
+def add_release_args(parser):
+    """Adds the options shared by every command that releases versions."""
     parser.add_argument(
         "--commit",
         action="store_true",
@@ -50,33 +368,87 @@ def parse_args(args):
         default=False,
         help="create release tag (doesn't push)",
     )
+    add_inference_args(parser)
     parser.add_argument(
-        "--suffix-dot-suffix",
+        "--tag-selection",
+        choices=("topology", "version"),
+        default="topology",
+        help="start from the most recent tag in history, or from the highest "
+        "reachable release (or --prerelease-suffix prerelease) version",
+    )
+    parser.add_argument(
+        "--traversal",
+        choices=("all", "first-parent", "merges"),
+        default="all",
+        help="read every commit, only the release line's (first-parent) "
+        "commits, or those plus the commits of merges whose message isn't "
+        "Conventional Commits-compliant",
+    )
+    parser.add_argument(
+        "--read-only",
         action="store_true",
         default=False,
-        help="add a dot between suffix and following version number",
+        help="open the repo without writing to it or running git to find it "
+        "(works on bare repos and read-only mounts; incompatible with --commit, "
+        "--tag and deepening; --cache and --notes are read but not updated)",
     )
     parser.add_argument(
-        "--suffix-dash-prefix",
+        "--notes",
         action="store_true",
         default=False,
-        help="add a dash between semver micro and suffix",
+        help="resume from the version state noted (in refs/notes/asgard) on the "
+        "nearest commit since the release tag, and note HEAD's (unless "
+        "--read-only)",
     )
     parser.add_argument(
-        "--version",
+        "--notes-remote",
+        metavar="REMOTE",
+        help="like --notes, fetching the notes from REMOTE first and pushing "
+        "them back after",
+    )
+    parser.add_argument(
+        "--no-deepen",
         action="store_true",
         default=False,
-        help="print program version and exit",
+        help="in a shallow clone, don't fetch more history when no release tag "
+        "is reachable (by default, history is deepened until one is)",
     )
+
+
+def add_inference_args(parser):
+    """Adds the options that change how versions are inferred from history.
+
+    These are shared with commands that only report versions, like timeline.
+    """
     parser.add_argument(
         "--prerelease-suffix",
         default="",
         help="append a suffix to semver (useful for prereleases)",
     )
     parser.add_argument(
-        "--repo-path", default=os.getcwd(), help="git repo path (defaults to '.')"
+        "--suffix-dot-suffix",
+        action="store_true",
+        default=False,
+        help="add a dot between suffix and following version number",
+    )
+    parser.add_argument(
+        "--suffix-dash-prefix",
+        action="store_true",
+        default=False,
+        help="add a dash between semver micro and suffix",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        default=False,
+        help="cache commit classifications in the repo's git dir",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("git", "native"),
+        default="git",
+        help="read history by running git or by parsing .git directly",
     )
-    return parser.parse_args(args)
 
 
 def get_latest_tag_index(log):
@@ -87,9 +459,85 @@ def get_latest_tag_index(log):
     return latest
 
 
-def infer_vnext(log, suffix=None, suffix_dot_suffix=False, suffix_dash_prefix=False):
+def classify(commit, cache=None):
+    """Returns the commit's Conventional Commits type, consulting cache if given."""
+    stats.count("commits_examined")
+    if isinstance(commit, Commit):
+        # Compact records were classified when the log was read.
+        if commit.msg_type is None:
+            raise ValueError("not a Conventional Commits-compliant message")
+        return commit.msg_type
+    with stats.phase("classify"):
+        return _classify(commit, cache)
+
+
+def _classify(commit, cache):
+    if cache is not None:
+        msg_type = cache.get(commit["hash"])
+        if msg_type == cache.invalid:
+            raise ValueError()
+        if msg_type is not None:
+            return msg_type
+    try:
+        msg_type = ConventionalCommitMsg(commit["message"]).msg_type
+    except Exception:
+        if cache is not None:
+            cache.put(commit["hash"], cache.invalid)
+        raise
+    if cache is not None:
+        cache.put(commit["hash"], msg_type)
+    return msg_type
+
+
+def infer_vnext(
+    log, suffix=None, suffix_dot_suffix=False, suffix_dash_prefix=False, cache=None
+):
     latest_tag_index = get_latest_tag_index(log)
     if latest_tag_index is None:
+        tag, pending = None, ()
+    else:
+        tag, pending = log[latest_tag_index]["tag"], log[latest_tag_index + 1 :]
+    return next_version(
+        tag,
+        pending,
+        suffix=suffix,
+        suffix_dot_suffix=suffix_dot_suffix,
+        suffix_dash_prefix=suffix_dash_prefix,
+        cache=cache,
+    )
+
+
+def next_version(
+    tag,
+    pending,
+    suffix=None,
+    suffix_dot_suffix=False,
+    suffix_dash_prefix=False,
+    cache=None,
+):
+    """Returns the version following tag, given the commits made since.
+
+    pending is only iterated when the bump depends on it, and only until the
+    bump is settled, so it can be a lazy iterator over git's output.
+    """
+    return bump_version(
+        tag,
+        lambda: bump_level(pending, cache),
+        suffix=suffix,
+        suffix_dot_suffix=suffix_dot_suffix,
+        suffix_dash_prefix=suffix_dash_prefix,
+    )
+
+
+def bump_version(
+    tag, bump, suffix=None, suffix_dot_suffix=False, suffix_dash_prefix=False
+):
+    """Returns the version following tag for a bump level.
+
+    bump is "major", "minor" or "micro", or a function returning one, only
+    called when the bump matters.
+    """
+    if tag is None:
         if suffix:
             return SemVer(
                 0,
@@ -102,37 +550,111 @@ def infer_vnext(log, suffix=None, suffix_dot_suffix=False, suffix_dash_prefix=Fa
             )
         else:
             return SemVer(0, 1, 0)
-    else:
-        version = SemVer.fromstr(log[latest_tag_index]["tag"].replace("v", ""))
-        if (
-            version.isprerelease()
-            and version.suffix_dash_prefix == suffix_dash_prefix
-            and version.suffix == suffix
-            and version.suffix_dot_suffix == suffix_dot_suffix
-        ):
-            version.increment_suffix_number()
-            return version
-        if latest_tag_index == len(log) - 1:
-            version.increment_micro()
-            return version
-        major_bump, minor_bump = False, False
-        for commit in log[latest_tag_index + 1 :]:
-            try:
-                cc_msg_type = ConventionalCommitMsg(commit["message"]).msg_type
-                if cc_msg_type == "BREAKING CHANGE":
-                    major_bump = True
-                elif cc_msg_type == "feat":
-                    minor_bump = True
-            except Exception as e:
-                print(
-                    f"WARNING: Commit '{commit['hash']}' did not have a Conventional Commits-compliant message.",
-                    file=sys.stderr,
-                )
-                print(e, file=sys.stderr)
-        if major_bump:
-            version.increment_major()
-        elif minor_bump:
-            version.increment_minor()
-        else:
-            version.increment_micro()
+    version = SemVer.fromstr(tag.replace("v", ""))
+    if _continues_prerelease(version, suffix, suffix_dot_suffix, suffix_dash_prefix):
+        version.increment_suffix_number()
         return version
+    if callable(bump):
+        bump = bump()
+    if bump == "major":
+        version.increment_major()
+    elif bump == "minor":
+        version.increment_minor()
+    else:
+        version.increment_micro()
+    return version
+
+
+def needs_bump(tag, suffix=None, suffix_dot_suffix=False, suffix_dash_prefix=False):
+    """Returns whether the version following tag depends on the commits since."""
+    if tag is None:
+        return False
+    version = SemVer.fromstr(tag.replace("v", ""))
+    return not _continues_prerelease(
+        version, suffix, suffix_dot_suffix, suffix_dash_prefix
+    )
+
+
+def _continues_prerelease(version, suffix, suffix_dot_suffix, suffix_dash_prefix):
+    return (
+        version.isprerelease()
+        and version.suffix_dash_prefix == suffix_dash_prefix
+        and version.suffix == suffix
+        and version.suffix_dot_suffix == suffix_dot_suffix
+    )
+
+
+def bump_level(commits, cache=None):
+    """Returns "major", "minor" or "micro" for a stream of unreleased commits.
+
+    Stops consuming commits at the first breaking change, since nothing after
+    it can change the outcome.
+    """
+    bump = "micro"
+    for commit in commits:
+        bump = next_bump(bump, commit, cache)
+        if bump == "major":
+            break
+    return bump
+
+
+def next_bump(bump, commit, cache=None):
+    """Returns the bump level once commit is counted on top of bump.
+
+    Commits without a Conventional Commits-compliant message are warned about
+    and leave the level as it is.
+    """
+    try:
+        cc_msg_type = classify(commit, cache)
+    except Exception as e:
+        print(
+            f"WARNING: Commit '{commit['hash']}' did not have a Conventional Commits-compliant message.",
+            file=sys.stderr,
+        )
+        print(e, file=sys.stderr)
+        return bump
+    if cc_msg_type == "BREAKING CHANGE":
+        return "major"
+    elif cc_msg_type == "feat" and bump == "micro":
+        return "minor"
+    return bump
+
+
+def split_package_logs(log, packages, tags):
+    """Splits a log with paths into one log per package.
+
+    A package's log holds the commits that changed files under its path, plus
+    the commits carrying one of its NAME/ tags (which then become the
+    record's "tag").
+    """
+    roots = {}
+    for name, path in packages:
+        roots.setdefault(path, []).append(name)
+    tagged = {}
+    for name, _ in packages:
+        index = TagIndex(tags, prefix=f"{name}/")
+        for commit_hash in index.by_commit:
+            tagged.setdefault(commit_hash, {})[name] = index.tag(commit_hash)
+    logs = {name: [] for name, _ in packages}
+    for commit in log:
+        commit_tags = tagged.get(commit["hash"], {})
+        touched = set(commit_tags).union(roots.get(".", ()))
+        for path in commit["paths"]:
+            parts = path.split("/")
+            for i in range(1, len(parts) + 1):
+                touched.update(roots.get("/".join(parts[:i]), ()))
+        for name in touched:
+            record = {"hash": commit["hash"], "message": commit["message"]}
+            if name in commit_tags:
+                record["tag"] = commit_tags[name]
+            logs[name].append(record)
+    return {name: tuple(package_log) for name, package_log in logs.items()}
+
+
+def infer_package_vnexts(log, packages, tags, cache=None, **kwargs):
+    """Returns {package name: vnext} for packages with unreleased commits."""
+    vnexts = {}
+    for name, package_log in split_package_logs(log, packages, tags).items():
+        if package_log and "tag" not in package_log[-1]:
+            vnexts[name] = infer_vnext(package_log, cache=cache, **kwargs)
+    return vnexts
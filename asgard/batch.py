@@ -0,0 +1,72 @@
+"""Batch mode: infer next versions for many repos concurrently."""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from asgard.app import add_release_args, open_cache, open_repo, release
+
+
+def main(args=sys.argv[1:]):
+    a = parse_args(args)
+    repo_paths = list(a.repo_paths)
+    if a.manifest:
+        repo_paths += read_manifest(a.manifest)
+    if not repo_paths:
+        raise ValueError("No repo paths given.")
+
+    failed = False
+    with ProcessPoolExecutor(max_workers=a.jobs) as pool:
+        futures = [pool.submit(release_repo, path, a) for path in repo_paths]
+        for future in as_completed(futures):
+            result = future.result()
+            failed = failed or "error" in result
+            print(json.dumps(result), flush=True)
+    if failed:
+        sys.exit(1)
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        prog="asgard batch",
+        description="Infer the next version of several repos, printing one JSON "
+        "object per repo as each one finishes.",
+    )
+    add_release_args(parser)
+    parser.add_argument("repo_paths", nargs="*", help="git repo paths")
+    parser.add_argument(
+        "--manifest",
+        help="file listing repo paths, one per line ('-' for stdin; "
+        "blank lines and lines starting with '#' are skipped)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="number of repos processed at once (defaults to the CPU count)",
+    )
+    return parser.parse_args(args)
+
+
+def read_manifest(manifest):
+    if manifest == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(manifest) as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip() and line[0] != "#"]
+
+
+def release_repo(repo_path, a):
+    """Runs a release for one repo, returning its result as a dict."""
+    try:
+        if not os.path.isdir(repo_path):
+            raise FileNotFoundError(f"No such directory: {repo_path}")
+        # Pool workers outlive repos: close each one's git co-processes.
+        with open_repo(repo_path, a.backend, a.read_only) as g:
+            vnext = release(g, a, open_cache(g) if a.cache else None)
+        return {"repo": repo_path, "vnext": str(vnext)}
+    except Exception as e:
+        return {"repo": repo_path, "error": f"{type(e).__name__}: {e}"}
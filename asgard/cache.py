@@ -0,0 +1,65 @@
+"""On-disk cache of commit classifications, keyed by commit hash."""
+
+import os
+
+
+class ClassificationCache:
+    """Append-only map of commit hash to Conventional Commits type.
+
+    Commits are immutable, so a hash always classifies the same way; rewritten
+    history simply produces new hashes. Tags are mutable and are therefore
+    never cached. The file starts with a format header; entries written by a
+    different format (or parser) version are discarded and the file rewritten.
+    """
+
+    header = "asgard-cache 2\n"
+    invalid = "!"
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.pending = []
+        self.stale = True
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                if f.readline() != self.header:
+                    return
+                self.stale = False
+                for line in f:
+                    # A truncated trailing line means an interrupted write:
+                    # rewrite the file rather than append after it.
+                    if not line.endswith("\n"):
+                        self.stale = True
+                        break
+                    commit_hash, sep, msg_type = line.partition(" ")
+                    if sep:
+                        self.entries[commit_hash] = msg_type[:-1]
+        except OSError:
+            pass
+
+    def get(self, commit_hash):
+        return self.entries.get(commit_hash)
+
+    def put(self, commit_hash, msg_type):
+        if "\n" in msg_type:
+            return
+        if self.entries.get(commit_hash) != msg_type:
+            self.entries[commit_hash] = msg_type
+            self.pending.append(f"{commit_hash} {msg_type}\n")
+
+    def flush(self):
+        if not self.pending and not self.stale:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if self.stale:
+            with open(self.path, "w") as f:
+                f.write(self.header)
+                f.writelines(f"{h} {t}\n" for h, t in self.entries.items())
+            self.stale = False
+        else:
+            with open(self.path, "a") as f:
+                f.writelines(self.pending)
+        self.pending = []
@@ -0,0 +1,109 @@
+"""Release notes grouped by Conventional Commits type, prepended to a file."""
+
+import datetime
+import os
+import shutil
+import tempfile
+
+from asgard.conventionalcommits import ConventionalCommitMsg
+
+SECTIONS = {
+    "BREAKING CHANGE": "Breaking changes",
+    "feat": "Features",
+    "fix": "Bug fixes",
+    "perf": "Performance",
+}
+OTHER = "Other changes"
+
+
+class Changelog:
+    """Collects one release's notes as commits stream by.
+
+    Entries go to one spooled temporary file per section, so memory stays
+    flat however large the release is. Writing copies the existing file
+    after the new section byte for byte: older releases are never parsed or
+    re-rendered.
+    """
+
+    spool_size = 1 << 20
+
+    def __init__(self):
+        self.sections = {}
+
+    def add(self, commit):
+        try:
+            msg = ConventionalCommitMsg(commit["message"])
+            title = SECTIONS.get(msg.msg_type, msg.type)
+            scope = f"**{msg.scope}:** " if msg.scope else ""
+            entry = f"- {scope}{msg.description} ({commit['hash'][:7]})\n"
+        except ValueError:
+            title = OTHER
+            summary = commit["message"].split("\n", 1)[0]
+            entry = f"- {summary} ({commit['hash'][:7]})\n"
+        if title not in self.sections:
+            self.sections[title] = tempfile.SpooledTemporaryFile(
+                self.spool_size, mode="w+", encoding="utf-8"
+            )
+        self.sections[title].write(entry)
+
+    def recording(self, commits):
+        """Yields commits, adding each one to the notes as it goes by."""
+        for commit in commits:
+            self.add(commit)
+            yield commit
+
+    def titles(self):
+        known = [title for title in SECTIONS.values() if title in self.sections]
+        rest = sorted(t for t in self.sections if t not in known and t != OTHER)
+        return known + rest + ([OTHER] if OTHER in self.sections else [])
+
+    def write_section(self, out, version, date=None):
+        date = date or datetime.date.today().isoformat()
+        out.write(f"## {version} ({date})\n\n")
+        for title in self.titles():
+            spool = self.sections[title]
+            spool.seek(0)
+            out.write(f"### {title}\n\n")
+            shutil.copyfileobj(spool, out)
+            out.write("\n")
+
+    def prepend_to(self, path, version, date=None):
+        """Writes the release's section at the top of the changelog at path.
+
+        A leading "# Title" line (and the blank lines after it) stays on top.
+        The file is replaced atomically.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".changelog-")
+        try:
+            with open(fd, "w", encoding="utf-8") as out:
+                try:
+                    old = open(path, encoding="utf-8")
+                except FileNotFoundError:
+                    out.write("# Changelog\n\n")
+                    self.write_section(out, version, date)
+                else:
+                    with old:
+                        line = old.readline()
+                        if line.startswith("# "):
+                            out.write(line)
+                            line = old.readline()
+                            while line == "\n":
+                                out.write(line)
+                                line = old.readline()
+                        self.write_section(out, version, date)
+                        out.write(line)
+                        shutil.copyfileobj(old, out)
+            if os.path.exists(path):
+                shutil.copymode(path, tmp_path)
+            else:
+                os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def close(self):
+        for spool in self.sections.values():
+            spool.close()
+        self.sections = {}
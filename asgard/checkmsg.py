@@ -0,0 +1,55 @@
+"""commit-msg hook mode: validate a commit message file, then exit.
+
+Run as `asgard check-msg FILE` from .git/hooks/commit-msg. bin/asgard
+dispatches here before importing anything else, and this module only pulls in
+the parser, to keep the hook's startup time low.
+"""
+
+import sys
+
+from asgard.conventionalcommits import CommitMsgError, ConventionalCommitMsg
+
+SCISSORS = "# ------------------------ >8 ------------------------"
+# Messages git or git rebase --autosquash generate and later rewrite.
+GENERATED_PREFIXES = ("Merge ", "fixup! ", "squash! ", "amend! ")
+
+USAGE = "usage: asgard check-msg FILE"
+
+
+def clean_message(text):
+    """Strips what git strips with the default commit.cleanup mode.
+
+    That's '#' comment lines, everything from the scissors line on (added
+    by commit --verbose), and surrounding blank lines.
+    """
+    lines = []
+    for line in text.split("\n"):
+        if line.startswith(SCISSORS):
+            break
+        if not line.startswith("#"):
+            lines.append(line.rstrip())
+    return "\n".join(lines).strip()
+
+
+def main(args=sys.argv[1:]):
+    if len(args) != 1 or args[0] in ("-h", "--help"):
+        print(USAGE, file=sys.stderr)
+        sys.exit(0 if args and args[0] in ("-h", "--help") else 2)
+    try:
+        with open(args[0], encoding="utf-8", errors="replace") as f:
+            msg = clean_message(f.read())
+    except OSError as e:
+        print(f"asgard check-msg: {e}", file=sys.stderr)
+        sys.exit(2)
+    if msg.startswith(GENERATED_PREFIXES):
+        return
+    try:
+        ConventionalCommitMsg(msg)
+    except CommitMsgError as e:
+        header = msg.split("\n", 1)[0]
+        print(
+            f"asgard check-msg: not a Conventional Commits message ({e.rule}): {e}\n"
+            f"  {header}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
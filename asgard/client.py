@@ -0,0 +1,126 @@
+"""Thin client for a running `asgard serve` daemon.
+
+bin/asgard dispatches here before importing the app, and this module only
+imports what interpreter startup already loaded, so that answering takes
+little more than that and one round trip over the socket. That rules out
+socket (which pulls in enum) and json (which pulls in re): the low-level
+_socket module is used instead, requests are encoded by hand, and json is
+only imported to decode responses other than a plain version.
+"""
+
+import _socket
+import os
+import sys
+from types import SimpleNamespace
+
+USAGE = """usage: asgard query [--socket SOCKET] [--repo-path REPO_PATH] [OPTION ...]
+
+Print the next version of a repo, as inferred by a running 'asgard serve'.
+Other options (--tag, --prerelease-suffix, ...) are forwarded to the daemon.
+
+  --socket SOCKET        daemon socket path (defaults to $ASGARD_SOCKET, or
+                         asgard-UID.sock in $XDG_RUNTIME_DIR or $TMPDIR)
+  --repo-path REPO_PATH  git repo path (defaults to '.')"""
+
+
+def default_socket_path():
+    if os.environ.get("ASGARD_SOCKET"):
+        return os.environ["ASGARD_SOCKET"]
+    runtime_dir = (
+        os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR") or "/tmp"
+    )
+    return os.path.join(runtime_dir, f"asgard-{os.getuid()}.sock")
+
+
+def query(socket_path, request):
+    """Sends one request dict to the daemon and returns its response dict."""
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        sock.sendall(encode(request).encode() + b"\n")
+        chunks = []
+        while not chunks or not chunks[-1].endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        sock.close()
+    response = b"".join(chunks)
+    if not response:
+        raise ConnectionError(f"No response from daemon at {socket_path}.")
+    return decode(response)
+
+
+def encode(value):
+    """Returns the JSON for a request: dicts, lists and strings."""
+    if isinstance(value, dict):
+        items = (f"{encode(k)}: {encode(v)}" for k, v in value.items())
+        return "{" + ", ".join(items) + "}"
+    if isinstance(value, list):
+        return "[" + ", ".join(encode(item) for item in value) + "]"
+    chars = []
+    for char in value:
+        if char in '"\\':
+            chars.append("\\" + char)
+        elif char < " " or "\ud800" <= char <= "\udfff":
+            chars.append(f"\\u{ord(char):04x}")
+        else:
+            chars.append(char)
+    return '"' + "".join(chars) + '"'
+
+
+def decode(response):
+    prefix, suffix = b'{"vnext": "', b'"}\n'
+    if (
+        response.startswith(prefix)
+        and response.endswith(suffix)
+        and response.count(b'"') == 4
+        and b"\\" not in response
+    ):
+        return {"vnext": response[len(prefix) : -len(suffix)].decode()}
+    import json
+
+    return json.loads(response)
+
+
+def main(args=sys.argv[1:]):
+    a, release_args = parse_args(args)
+    try:
+        response = query(
+            a.socket, {"repo": os.path.abspath(a.repo_path), "args": release_args}
+        )
+    except OSError as e:
+        sys.exit(f"asgard query: can't reach daemon at {a.socket}: {e}")
+    if "error" in response:
+        sys.exit(response["error"])
+    print(response["vnext"])
+
+
+def parse_args(args):
+    """Returns the client's own options and the release options to forward.
+
+    Parsed by hand rather than with argparse, which alone would double the
+    client's startup time.
+    """
+    a = SimpleNamespace(socket=None, repo_path=None)
+    release_args = []
+    args = iter(args)
+    for arg in args:
+        if arg in ("-h", "--help"):
+            print(USAGE)
+            sys.exit(0)
+        name, sep, value = arg.partition("=")
+        if name not in ("--socket", "--repo-path"):
+            release_args.append(arg)
+            continue
+        if not sep:
+            value = next(args, None)
+            if value is None:
+                sys.exit(f"{USAGE.splitlines()[0]}\nasgard query: {name} needs a value")
+        setattr(a, name[2:].replace("-", "_"), value)
+    if a.socket is None:
+        a.socket = default_socket_path()
+    if a.repo_path is None:
+        a.repo_path = os.getcwd()
+    return a, release_args
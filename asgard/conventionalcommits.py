@@ -1,22 +1,128 @@
-import re
+BREAKING_TOKENS = ("BREAKING CHANGE", "BREAKING-CHANGE")
+
+
+class CommitMsgError(ValueError):
+    """A message that isn't Conventional Commits-compliant.
+
+    rule names the check that failed, e.g. "type-case".
+    """
+
+    def __init__(self, rule, message):
+        super().__init__(message)
+        self.rule = rule
+
+
+def _token_end(text):
+    """Returns the length of the run of word characters and dashes text starts with.
+
+    A plain scan rather than a regex: it is linear all the same, and keeps the
+    re module out of the commit-msg hook's imports.
+    """
+    i = 0
+    for char in text:
+        if not (char.isalnum() or char == "_" or char == "-"):
+            break
+        i += 1
+    return i
+
+
+def _footer_token(line):
+    """Returns (token, value) if line starts a footer, else None.
+
+    Footers look like "Token: value" or "Token #value", where the token is a
+    word (dashes instead of spaces) or BREAKING CHANGE.
+    """
+    for token in BREAKING_TOKENS:
+        if line.startswith(token + ": "):
+            return token, line[len(token) + 2 :]
+    i = _token_end(line)
+    if i and (line.startswith(": ", i) or line.startswith(" #", i)):
+        return line[:i], line[i + 2 :]
+    return None
 
 
 class ConventionalCommitMsg:
+    """A parsed Conventional Commits message.
+
+    Parsing never backtracks: the message is split into lines once, the
+    header is scanned left to right, and every other line is scanned from its
+    start at most three times (blank check, footer token, breaking change
+    marker) with forward-only scans. The worst case is therefore O(n) in the
+    message length, whatever its content.
+    """
+
     def __init__(self, msg):
-        if (
-            len(msg) < 4
-            or re.search(r"([^:]+):", msg).group(1).isupper()
-            or not msg[0].isalpha()
-            or re.search(r"[^:]+:(.{1})", msg).group(1) != " "
-        ):
-            raise ValueError()
+        if len(msg) < 4:
+            raise CommitMsgError("too-short", "message must be at least 4 characters")
+        lines = msg.split("\n")
         self.msg = msg
+        self.type, self.scope, self.breaking, self.description = self._parse_header(
+            lines[0]
+        )
+
+        rest = lines[1:]
+        footer_start = len(rest)
+        paragraph_start = 0
+        for i, line in enumerate(rest):
+            if not line.strip():
+                paragraph_start = i + 1
+        if paragraph_start < len(rest) and _footer_token(rest[paragraph_start]):
+            footer_start = paragraph_start
+
+        footers = []
+        for line in rest[footer_start:]:
+            footer = _footer_token(line)
+            if footer:
+                footers.append((footer[0], [footer[1]]))
+            elif footers:
+                footers[-1][1].append(line)
+        self.footers = [(token, "\n".join(value)) for token, value in footers]
+        self.body = "\n".join(rest[:footer_start]).strip()
+
+        # Breaking change footers are also honored outside of the footer
+        # paragraph, since messages often lack the blank line before them.
+        for line in rest:
+            if line.startswith(BREAKING_TOKENS):
+                footer = _footer_token(line)
+                if footer and footer[0] in BREAKING_TOKENS:
+                    self.breaking = True
+
+    @staticmethod
+    def _parse_header(header):
+        if not header[:1].isalpha():
+            raise CommitMsgError("type-start", "type must start with a letter")
+        i = _token_end(header)
+        msg_type = header[:i]
+        if msg_type.isupper():
+            raise CommitMsgError("type-case", "type must not be all uppercase")
+        scope = None
+        if header.startswith("(", i):
+            end = header.find(")", i)
+            scope = header[i + 1 : end]
+            if end == -1 or not scope or "(" in scope:
+                raise CommitMsgError(
+                    "scope", "scope must be a non-empty name between parentheses"
+                )
+            i = end + 1
+        breaking = header.startswith("!", i)
+        if breaking:
+            i += 1
+        if not header.startswith(":", i):
+            raise CommitMsgError(
+                "type-colon", "type (and optional scope or '!') must end with ':'"
+            )
+        if not header.startswith(": ", i):
+            raise CommitMsgError("colon-space", "':' must be followed by a space")
+        description = header[i + 2 :].strip()
+        if not description:
+            raise CommitMsgError("description", "description must not be empty")
+        return msg_type, scope, breaking, description
 
     @property
     def msg_type(self):
-        if re.search(r"BREAKING CHANGE: ", self.msg):
+        if self.breaking:
             return "BREAKING CHANGE"
-        return re.search(r"([^:]+):", self.msg).group(1)
+        return self.type
 
     def __repr__(self):
         return self.msg
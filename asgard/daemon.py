@@ -0,0 +1,190 @@
+"""Daemon mode: answer vnext queries for warm repos over a Unix socket.
+
+Each request is one JSON line, {"repo": PATH, "args": [release options]},
+answered by one JSON line, {"vnext": VERSION} or {"error": MESSAGE}.
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+
+from asgard.app import add_release_args, open_cache, open_repo, release
+from asgard.client import default_socket_path
+from asgard.git import find_git_dir
+
+
+class WarmRepo:
+    """A repo kept open between queries, with its answers memoized.
+
+    Answers stay valid until HEAD or a ref changes. Git updates refs by
+    renaming a lock file over them, which touches the containing directory,
+    so stat'ing HEAD, the branch it points to, packed-refs and the
+    directories under refs/ is enough to notice any change without reading
+    history. When a change is noticed, the repo's cached views of refs and
+    packs are dropped too, since git may have repacked them. With --cache,
+    classifications are kept in the repo's cache across changes, so a
+    refresh only parses new commits.
+    """
+
+    def __init__(self, repo_path, backend="git", read_only=False):
+        self.g = open_repo(repo_path, backend, read_only)
+        self.git_dir, self.common_dir = find_git_dir(repo_path)
+        self.cache = None
+        self.stamp = None
+        self.answers = {}
+
+    def refs_stamp(self):
+        head = os.path.join(self.git_dir, "HEAD")
+        paths = [head, os.path.join(self.common_dir, "packed-refs")]
+        try:
+            with open(head) as f:
+                target = f.read()
+            if target.startswith("ref: "):
+                paths.append(os.path.join(self.common_dir, target[5:].strip()))
+        except OSError:
+            pass
+        for root, _, _ in os.walk(os.path.join(self.common_dir, "refs")):
+            paths.append(root)
+        stamp = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+                stamp.append((path, st.st_ino, st.st_size, st.st_mtime_ns))
+            except OSError:
+                stamp.append((path, None))
+        return tuple(stamp)
+
+    def vnext(self, a, key):
+        stamp = self.refs_stamp()
+        if stamp != self.stamp:
+            self.answers.clear()
+            self.g.close()
+            self.stamp = stamp
+        if key not in self.answers:
+            if a.cache and self.cache is None:
+                self.cache = open_cache(self.g)
+            vnext = str(release(self.g, a, self.cache if a.cache else None))
+            if a.commit or a.tag:
+                # The release just moved refs; the next query rereads them.
+                self.stamp = None
+                return vnext
+            self.answers[key] = vnext
+        return self.answers[key]
+
+    def close(self):
+        self.g.close()
+
+
+class Server(socketserver.UnixStreamServer):
+    """Serves queries one at a time, keeping every queried repo warm."""
+
+    def __init__(self, socket_path, repo_paths=(), backend="git"):
+        self.repos = {}
+        for repo_path in repo_paths:
+            self.repo(os.path.abspath(repo_path), backend)
+        if os.path.exists(socket_path):
+            remove_stale_socket(socket_path)
+        super().__init__(socket_path, QueryHandler)
+
+    def repo(self, repo_path, backend, read_only=False):
+        key = (repo_path, backend, read_only)
+        if key not in self.repos:
+            if not os.path.isdir(repo_path):
+                raise FileNotFoundError(f"No such directory: {repo_path}")
+            self.repos[key] = WarmRepo(repo_path, backend, read_only)
+        return self.repos[key]
+
+    def answer(self, request):
+        try:
+            a = parse_release_args(request.get("args", []))
+            key = tuple(request.get("args", []))
+            warm = self.repo(request["repo"], a.backend, a.read_only)
+            vnext = warm.vnext(a, key)
+            return {"vnext": vnext}
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    def server_close(self):
+        super().server_close()
+        for warm in self.repos.values():
+            warm.close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+class QueryHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.server.answer(json.loads(line))
+            except ValueError as e:
+                response = {"error": f"Invalid request: {e}"}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class ArgumentError(ValueError):
+    pass
+
+
+class _Parser(argparse.ArgumentParser):
+    def error(self, message):
+        raise ArgumentError(message)
+
+
+def parse_release_args(args):
+    parser = _Parser(prog="asgard query", add_help=False)
+    add_release_args(parser)
+    return parser.parse_args(args)
+
+
+def remove_stale_socket(socket_path):
+    """Removes a socket file left behind by a daemon that's no longer running."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            os.unlink(socket_path)
+            return
+    raise RuntimeError(f"A daemon is already listening on {socket_path}.")
+
+
+def main(args=sys.argv[1:]):
+    a = parse_args(args)
+    with Server(a.socket, a.repo_paths, a.backend) as server:
+        print(f"asgard: serving on {a.socket}", file=sys.stderr, flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        prog="asgard serve",
+        description="Keep repos open and answer 'asgard query' requests over a "
+        "Unix socket, rereading history only when HEAD or refs change.",
+    )
+    parser.add_argument(
+        "repo_paths",
+        nargs="*",
+        help="repos to load right away (others load on their first query)",
+    )
+    parser.add_argument(
+        "--socket",
+        default=default_socket_path(),
+        help="socket path (defaults to $ASGARD_SOCKET, or asgard-UID.sock in "
+        "$XDG_RUNTIME_DIR or the temp dir)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("git", "native"),
+        default="git",
+        help="backend of the repos loaded right away (queries can ask for either)",
+    )
+    return parser.parse_args(args)
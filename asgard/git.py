@@ -3,17 +3,168 @@ import os
 import shutil
 from tempfile import mkdtemp
 
+from asgard import stats
+from asgard.conventionalcommits import ConventionalCommitMsg
+from asgard.odb import NativeRepo, TYPE_NAMES
+from asgard.records import CommitLog
+from asgard.tags import TagIndex
+
+OBJECT_TYPES = {obj_type: name.decode() for name, obj_type in TYPE_NAMES.items()}
+# for-each-ref format of tag listings: object, peeled commit (for annotated
+# tags), then the tag name.
+TAGS_FORMAT = "%(objectname) %(*objectname) %(refname:strip=2)"
+
+
+class CatFile:
+    """A long-lived `git cat-file --batch` (or --batch-check) co-process.
+
+    Objects are requested over the child's stdin, one per line. If the child
+    has died, it is restarted and the request retried once.
+    """
+
+    def __init__(self, repo_path, mode="--batch"):
+        self.repo_path = repo_path
+        self.mode = mode
+        self.proc = None
+
+    def _start(self):
+        stats.count("git_processes")
+        self.proc = subprocess.Popen(
+            ["git", "cat-file", self.mode],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=self.repo_path,
+        )
+
+    def request(self, rev):
+        """Returns (hash, type, size, data) for rev, or None if it's missing.
+
+        data is None in --batch-check mode.
+        """
+        for attempt in range(2):
+            if self.proc is None or self.proc.poll() is not None:
+                self._start()
+            try:
+                self.proc.stdin.write(rev.encode() + b"\n")
+                self.proc.stdin.flush()
+                header = self.proc.stdout.readline()
+                if not header:
+                    raise BrokenPipeError()
+                fields = header.decode().split()
+                if len(fields) != 3:
+                    return None
+                oid, obj_type, size = fields[0], fields[1], int(fields[2])
+                data = None
+                if self.mode == "--batch":
+                    data = self.proc.stdout.read(size + 1)[:-1]
+                    if len(data) != size:
+                        raise BrokenPipeError()
+                stats.count("git_bytes_read", len(header) + size)
+                return oid, obj_type, size, data
+            except OSError:
+                self.close()
+                if attempt:
+                    raise
+        return None
+
+    def close(self):
+        if self.proc is not None:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+            self.proc.kill()
+            self.proc.wait()
+            self.proc.stdout.close()
+            self.proc = None
+
+
+def _is_git_dir(path):
+    return os.path.isfile(os.path.join(path, "HEAD")) and (
+        os.path.isdir(os.path.join(path, "objects"))
+        or os.path.isfile(os.path.join(path, "commondir"))
+    )
+
+
+def find_git_dir(repo_path, search_parents=True):
+    """Returns (git dir, common dir) for a repo, without running git.
+
+    Like git, honors GIT_DIR, then looks for a .git directory or a .git file
+    pointing elsewhere (linked worktrees, submodules), or a bare repo, in
+    repo_path and, with search_parents, in the directories above it. The
+    common dir is where a linked worktree's objects and refs live; it's the
+    git dir itself otherwise. Raises ValueError if there's no repo.
+    """
+    if os.environ.get("GIT_DIR"):
+        candidates = [os.path.join(repo_path, os.environ["GIT_DIR"])]
+    else:
+        candidates = []
+        path = os.path.abspath(repo_path)
+        while True:
+            dot_git = os.path.join(path, ".git")
+            if os.path.isfile(dot_git):
+                with open(dot_git) as f:
+                    content = f.read().strip()
+                if content.startswith("gitdir: "):
+                    dot_git = os.path.join(path, content[len("gitdir: ") :])
+            candidates += [dot_git, path]
+            parent = os.path.dirname(path)
+            if not search_parents or parent == path:
+                break
+            path = parent
+    for git_dir in candidates:
+        if _is_git_dir(git_dir):
+            common_dir = git_dir
+            commondir_file = os.path.join(git_dir, "commondir")
+            if os.path.isfile(commondir_file):
+                with open(commondir_file) as f:
+                    common_dir = os.path.join(git_dir, f.read().strip())
+            return os.path.normpath(git_dir), os.path.normpath(common_dir)
+    raise ValueError(f"Not a git repository: {repo_path}")
+
 
 class GitRepo:
-    def __init__(self, repo_path=None):
-        if repo_path is not None and os.path.exists(repo_path):
+    """A git repo, driven through git subprocesses.
+
+    By default, a repo is created (at repo_path, or in a temporary directory
+    if that doesn't exist) unless repo_path already holds one. With
+    read_only, repo_path must be in an existing repo, which is found without
+    spawning git, and anything that would write to it raises PermissionError.
+    Leaving a with block only deletes the repo if it was a temporary one.
+    """
+
+    def __init__(self, repo_path=None, read_only=False):
+        self.read_only = read_only
+        self._git_dir = None
+        self._temporary = False
+        if read_only:
+            if repo_path is None or not os.path.isdir(repo_path):
+                raise FileNotFoundError(f"No such directory: {repo_path}")
             self.repo_path = repo_path
+            self._git_dir = find_git_dir(repo_path)[0]
         else:
-            self.repo_path = mkdtemp()
-        self.git("init")
+            if repo_path is not None and os.path.exists(repo_path):
+                self.repo_path = repo_path
+                try:
+                    self._git_dir = find_git_dir(repo_path, search_parents=False)[0]
+                except ValueError:
+                    pass
+            else:
+                self.repo_path = mkdtemp()
+                self._temporary = True
+            if self._git_dir is None:
+                self.git("init")
+        self._cat_file = CatFile(self.repo_path)
+        self._cat_file_check = CatFile(self.repo_path, "--batch-check")
+
+    def _check_writable(self):
+        if self.read_only:
+            raise PermissionError(f"Git repo at {self.repo_path} was opened read-only.")
 
     def git(self, cmd, stdin_str=None):
-        return subprocess.run(
+        stats.count("git_processes")
+        res = subprocess.run(
             f"git {cmd}",
             shell=True,
             stdout=subprocess.PIPE,
@@ -21,43 +172,396 @@ class GitRepo:
             input=stdin_str,
             cwd=self.repo_path,
         )
+        stats.count("git_bytes_read", len(res.stdout))
+        return res
+
+    def git_dir(self):
+        if self._git_dir is not None:
+            return os.path.abspath(self._git_dir)
+        return self.git("rev-parse --absolute-git-dir").stdout.decode().strip()
+
+    def is_shallow(self):
+        res = self.git("rev-parse --is-shallow-repository")
+        return res.stdout.strip() == b"true"
+
+    def deepen(self, commits):
+        """Fetches that many more commits of history from the default remote.
+
+        Tags pointing at the fetched commits come along with them.
+        """
+        self._check_writable()
+        res = self.git(f"fetch --quiet --deepen={commits}")
+        if res.returncode != 0:
+            raise RuntimeError(
+                f"Couldn't deepen shallow clone: {res.stderr.decode().strip()}"
+            )
+        # Cached views of the object database predate the fetch.
+        self.close()
 
     def add(self, path="."):
+        self._check_writable()
         self.git(f"add {path}")
 
     def commit(self, message, allow_empty=False):
+        self._check_writable()
         commit_opts = ""
         if allow_empty:
             commit_opts += "--allow-empty"
         self.git(f"commit {commit_opts} --file=-", stdin_str=message.encode())
 
     def tag(self, tag):
+        self._check_writable()
         self.git(f"tag {tag}")
 
-    def log(self):
-        res = self.git("log --pretty='%H'").stdout.decode().strip()
-        if res:
-            log = []
-            for commit_hash in res.split("\n"):
-                commit_dict = {
-                    "hash": commit_hash,
-                    "message": self.git(f"show --no-patch --format='%B' {commit_hash}")
-                    .stdout.decode()
-                    .strip(),
-                }
-                commit_describe = self.git(
-                    f"describe --tags --exact-match {commit_hash}"
-                )
-                if commit_describe.returncode == 0:
-                    commit_dict["tag"] = commit_describe.stdout.decode().strip()
-                log.append(commit_dict)
-            log.reverse()
-            return tuple(log)
-        else:
-            return ()
+    def add_note(self, rev, text, ref):
+        """Attaches text to rev as a note under ref, replacing any existing one."""
+        self._check_writable()
+        res = self.git(f"notes --ref={ref} add --force --file=- {rev}", text.encode())
+        if res.returncode != 0:
+            raise RuntimeError(f"Couldn't add note: {res.stderr.decode().strip()}")
+
+    def fetch(self, remote, refspec):
+        self._check_writable()
+        res = self.git(f"fetch --quiet {remote} {refspec}")
+        if res.returncode != 0:
+            raise RuntimeError(
+                f"Couldn't fetch {refspec} from {remote}: {res.stderr.decode().strip()}"
+            )
+        self.close()
+
+    def push(self, remote, refspec):
+        res = self.git(f"push --quiet {remote} {refspec}")
+        if res.returncode != 0:
+            raise RuntimeError(
+                f"Couldn't push {refspec} to {remote}: {res.stderr.decode().strip()}"
+            )
+
+    def log(self, since_latest_tag=False, paths=False, compact=False, classify=None):
+        """Returns commit records, oldest first.
+
+        With paths, each record also lists the files the commit changed
+        ("paths"; empty for merges, as in git log --name-only).
+
+        With compact, a CommitLog is returned instead: each commit is
+        classified as it streams by (with classify, a function taking a record
+        and returning its type or raising ValueError, if given), and only its
+        hash, type and tag are kept. paths isn't supported then.
+        """
+        index = self.tag_index()
+        ranges = [{}]
+        if since_latest_tag:
+            latest = self.latest_tag(index)
+            if latest is not None:
+                ranges = [
+                    {"exclude": latest[0]},
+                    {"head": latest[0], "max_count": 1},
+                ]
+        if compact:
+            if paths:
+                raise ValueError("Compact logs don't keep paths.")
+            return self._compact_log(ranges, index, classify)
+        log = []
+        for rev_range in ranges:
+            log += self._read_log(index=index, paths=paths, **rev_range)
+        log.reverse()
+        return tuple(log)
+
+    def _compact_log(self, ranges, index, classify=None):
+        log = CommitLog(self)
+        for rev_range in ranges:
+            for commit in self.iter_log(index=index, **rev_range):
+                try:
+                    if classify is None:
+                        msg_type = ConventionalCommitMsg(commit["message"]).msg_type
+                    else:
+                        msg_type = classify(commit)
+                except ValueError:
+                    msg_type = None
+                log.append(commit["hash"], msg_type, commit.get("tag"))
+        return log
+
+    def latest_tag(self, index=None, first_parent=False):
+        """Returns (hash, tag) for the newest semver tag reachable from HEAD.
+
+        With first_parent, only tags on HEAD's first-parent line count.
+        """
+        index = self.tag_index() if index is None else index
+        if not index:
+            return None
+        hashes = self.iter_hashes(first_parent=first_parent)
+        try:
+            for commit_hash in hashes:
+                if commit_hash in index:
+                    return commit_hash, index.tag(commit_hash)
+        finally:
+            hashes.close()
+        return None
+
+    def iter_hashes(self, head="HEAD", exclude=None, first_parent=False):
+        """Yields commit hashes newest first, like iter_log without messages.
+
+        Closing the generator early stops the underlying git process.
+        """
+        rev_range = f"{exclude}..{head}" if exclude else head
+        if first_parent:
+            rev_range = f"--first-parent {rev_range}"
+        stats.count("git_processes")
+        with subprocess.Popen(
+            f"git log --format=%H {rev_range}",
+            shell=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=self.repo_path,
+        ) as proc:
+            try:
+                for line in proc.stdout:
+                    stats.count("git_bytes_read", len(line))
+                    yield line.decode().rstrip("\n")
+            finally:
+                proc.kill()
+
+    def tags(self, merged=None):
+        """Returns (commit hash, tag name) pairs for all tags, peeled.
+
+        With merged (e.g. "HEAD"), only tags reachable from it are returned.
+        """
+        merged_opt = f"--merged={merged}" if merged else ""
+        res = self.git(f"for-each-ref {merged_opt} --format='{TAGS_FORMAT}' refs/tags")
+        return self._parse_tags(res.stdout)
+
+    @staticmethod
+    def _parse_tags(out):
+        tags = []
+        for line in out.decode().splitlines():
+            oid, peeled, tag = line.split(" ", 2)
+            tags.append((peeled or oid, tag))
+        return tags
+
+    def tag_index(self, prefix="", merged=None):
+        return TagIndex(self.tags(merged), prefix)
+
+    def iter_log(
+        self,
+        head="HEAD",
+        exclude=None,
+        max_count=None,
+        index=None,
+        paths=False,
+        first_parent=False,
+        parents=False,
+    ):
+        """Yields commit records newest first, reading git's output lazily.
+
+        With first_parent, merges are entered through their first parent
+        only. With parents, each record also lists the commit's parents
+        ("parents"; empty for roots and shallow boundaries). Closing the
+        generator early stops the underlying git process.
+        """
+        rev_range = f"{exclude}..{head}" if exclude else head
+        if first_parent:
+            rev_range = f"--first-parent {rev_range}"
+        if max_count is not None:
+            rev_range = f"--max-count={max_count} {rev_range}"
+        if paths:
+            rev_range = f"--no-renames --name-only {rev_range}"
+        index = self.tag_index() if index is None else index
+        # Records start with \x01 so that they can be told apart from the
+        # NUL-terminated file names --name-only appends to them.
+        stats.count("git_processes")
+        with subprocess.Popen(
+            f"git log -z --format='%x01%H{' %P' if parents else ''}%x00%B' {rev_range}",
+            shell=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=self.repo_path,
+        ) as proc:
+            try:
+                for record in self._split_records(proc.stdout):
+                    yield self._parse_record(record, index, paths, parents)
+            finally:
+                proc.kill()
+
+    @staticmethod
+    def _parse_record(record, index, paths=False, parents=False):
+        fields = record.decode().split("\0")
+        commit_hash = fields[0]
+        if parents:
+            commit_hash, *commit_parents = commit_hash.split()
+        commit_dict = {"hash": commit_hash, "message": fields[1].strip()}
+        if commit_hash in index:
+            commit_dict["tag"] = index.tag(commit_hash)
+        if parents:
+            commit_dict["parents"] = commit_parents
+        if paths:
+            commit_dict["paths"] = [f.lstrip("\n") for f in fields[2:] if f]
+        return commit_dict
+
+    @staticmethod
+    def _split_records(stream, separator=b"\0\x01"):
+        # Every record starts with \x01, including the first one.
+        if stream.read(1) != b"\x01":
+            return
+        pending = []
+        for chunk in iter(lambda: stream.read1(65536), b""):
+            stats.count("git_bytes_read", len(chunk))
+            if pending and pending[-1].endswith(b"\0") and chunk.startswith(b"\x01"):
+                yield b"".join(pending)
+                pending, chunk = [], chunk[1:]
+            records = chunk.split(separator)
+            if len(records) > 1:
+                yield b"".join(pending) + records[0]
+                yield from records[1:-1]
+                pending = []
+            pending.append(records[-1])
+        if pending:
+            yield b"".join(pending)
+
+    def _read_log(self, *args, **kwargs):
+        return list(self.iter_log(*args, **kwargs))
+
+    def read_object(self, rev):
+        """Returns (type, data) for an object, or None if it doesn't exist."""
+        res = self._cat_file.request(rev)
+        return (res[1], res[3]) if res else None
+
+    def object_info(self, rev):
+        """Returns (hash, type, size) for an object, or None if it doesn't exist."""
+        res = self._cat_file_check.request(rev)
+        return res[:3] if res else None
+
+    def resolve_commit(self, rev):
+        """Returns the hash of the commit rev names (peeling tags), or None."""
+        info = self.object_info(f"{rev}^{{commit}}")
+        return info[0] if info else None
+
+    def parents(self, rev):
+        """Returns the hashes of a commit's parents, first parent first."""
+        obj = self.read_object(rev)
+        if obj is None or obj[0] != "commit":
+            raise ValueError(f"{rev} is not a commit")
+        headers = obj[1].partition(b"\n\n")[0].split(b"\n")
+        return [line[7:].decode() for line in headers if line.startswith(b"parent ")]
+
+    def message(self, rev):
+        """Returns a commit's message, as found in log records."""
+        obj = self.read_object(rev)
+        if obj is None or obj[0] != "commit":
+            raise ValueError(f"{rev} is not a commit")
+        return obj[1].partition(b"\n\n")[2].decode(errors="replace").strip()
+
+    def close(self):
+        self._cat_file.close()
+        self._cat_file_check.close()
 
     def __enter__(self):
         return self
 
     def __exit__(self, *exc):
-        shutil.rmtree(self.repo_path)
+        self.close()
+        if self._temporary and not self.read_only:
+            shutil.rmtree(self.repo_path)
+
+
+class NativeGitRepo(GitRepo):
+    """GitRepo that reads history straight from .git, without spawning git.
+
+    Only reads are native; add, commit and tag still go through git.
+    """
+
+    def __init__(self, repo_path, read_only=False):
+        if not os.path.isdir(repo_path):
+            raise FileNotFoundError(f"No such directory: {repo_path}")
+        self.repo_path = repo_path
+        self.read_only = read_only
+        self.native = NativeRepo(*find_git_dir(repo_path))
+
+    def git_dir(self):
+        return os.path.abspath(self.native.git_dir)
+
+    def is_shallow(self):
+        return bool(self.native.shallow())
+
+    def iter_hashes(self, head="HEAD", exclude=None, first_parent=False):
+        head = self.native.resolve(head) if head == "HEAD" else head
+        if head is None:
+            return
+        for commit_hash, _ in self.native.walk(
+            [head], [exclude] if exclude else (), first_parent
+        ):
+            yield commit_hash
+
+    def tags(self, merged=None):
+        tags = [
+            (peeled or self.native.peel(oid), refname[len("refs/tags/") :])
+            for refname, oid, peeled in self.native.refs("refs/tags/")
+        ]
+        if merged:
+            reachable = self.native.reachable(
+                self._resolve(merged), {commit_hash for commit_hash, _ in tags}
+            )
+            tags = [tag for tag in tags if tag[0] in reachable]
+        return tags
+
+    def iter_log(
+        self,
+        head="HEAD",
+        exclude=None,
+        max_count=None,
+        index=None,
+        paths=False,
+        first_parent=False,
+        parents=False,
+    ):
+        head = self.native.resolve(head) if head == "HEAD" else head
+        if head is None:
+            return
+        index = self.tag_index() if index is None else index
+        count = 0
+        for commit_hash, message, commit_parents in self.native.walk(
+            [head], [exclude] if exclude else (), first_parent, with_parents=True
+        ):
+            commit_dict = {"hash": commit_hash, "message": message.strip()}
+            if commit_hash in index:
+                commit_dict["tag"] = index.tag(commit_hash)
+            if parents:
+                commit_dict["parents"] = commit_parents
+            if paths:
+                commit_dict["paths"] = self.native.changed_paths(commit_hash)
+            yield commit_dict
+            count += 1
+            if count == max_count:
+                return
+
+    def _resolve(self, rev):
+        for ref in (rev, f"refs/tags/{rev}", f"refs/heads/{rev}"):
+            oid = self.native.resolve(ref)
+            if oid is not None:
+                return oid
+        return rev
+
+    def read_object(self, rev):
+        try:
+            obj_type, data = self.native.odb.read(self._resolve(rev))
+        except (KeyError, ValueError):
+            return None
+        return OBJECT_TYPES[obj_type], data
+
+    def object_info(self, rev):
+        obj = self.read_object(rev)
+        if obj is None:
+            return None
+        return self._resolve(rev), obj[0], len(obj[1])
+
+    def resolve_commit(self, rev):
+        info = self.object_info(rev)
+        if info is None:
+            return None
+        oid = self.native.peel(info[0])
+        obj = self.read_object(oid)
+        return oid if obj is not None and obj[0] == "commit" else None
+
+    def close(self):
+        self.native.close()
+
+    def __exit__(self, *exc):
+        self.close()
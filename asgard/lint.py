@@ -0,0 +1,163 @@
+"""Lint mode: report every commit in a range that isn't Conventional Commits-compliant."""
+
+import argparse
+import json
+import os
+import shlex
+import sys
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from asgard.checkmsg import GENERATED_PREFIXES
+from asgard.conventionalcommits import CommitMsgError, ConventionalCommitMsg
+from asgard.git import GitRepo
+
+# Commits classified per task; ranges longer than one chunk go to a pool.
+CHUNK_SIZE = 20_000
+
+
+def check_chunk(commits):
+    """Returns a violation dict for each non-compliant (hash, message) pair."""
+    violations = []
+    for commit_hash, message in commits:
+        if message.startswith(GENERATED_PREFIXES):
+            continue
+        try:
+            ConventionalCommitMsg(message)
+        except CommitMsgError as e:
+            violations.append(
+                {
+                    "hash": commit_hash,
+                    "header": message.split("\n", 1)[0],
+                    "rule": e.rule,
+                    "error": str(e),
+                }
+            )
+    return violations
+
+
+def lint(commits, jobs=None, chunk_size=CHUNK_SIZE):
+    """Returns (hashes of the commits read, violations) for commit records.
+
+    Records are classified chunk_size at a time. Once a range turns out to
+    be longer than one chunk, chunks are handed to a pool of jobs processes
+    as they are read, so that classification overlaps with git's output.
+    """
+    pairs = ((commit["hash"], commit["message"]) for commit in commits)
+    hashes, violations = [], []
+    chunk = list(islice(pairs, chunk_size))
+    hashes += (commit_hash for commit_hash, _ in chunk)
+    if len(chunk) < chunk_size or jobs == 1:
+        while chunk:
+            violations += check_chunk(chunk)
+            chunk = list(islice(pairs, chunk_size))
+            hashes += (commit_hash for commit_hash, _ in chunk)
+        return hashes, violations
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = []
+        while chunk:
+            futures.append(pool.submit(check_chunk, chunk))
+            chunk = list(islice(pairs, chunk_size))
+            hashes += (commit_hash for commit_hash, _ in chunk)
+        for future in futures:
+            violations += future.result()
+    return hashes, violations
+
+
+def junit_report(rev_range, hashes, violations):
+    """Returns a JUnit XML document with a test case per commit."""
+    failed = {violation["hash"]: violation for violation in violations}
+    suites = ET.Element("testsuites")
+    suite = ET.SubElement(
+        suites,
+        "testsuite",
+        name=f"asgard lint {rev_range}",
+        tests=str(len(hashes)),
+        failures=str(len(violations)),
+        errors="0",
+    )
+    for commit_hash in hashes:
+        case = ET.SubElement(
+            suite, "testcase", classname="asgard.lint", name=commit_hash
+        )
+        if commit_hash in failed:
+            violation = failed[commit_hash]
+            failure = ET.SubElement(
+                case, "failure", type=violation["rule"], message=violation["error"]
+            )
+            failure.text = violation["header"]
+    return ET.tostring(suites, encoding="unicode") + "\n"
+
+
+def main(args=sys.argv[1:]):
+    a = parse_args(args)
+    g = GitRepo(a.repo_path, read_only=True)
+    try:
+        if g.git(f"rev-parse --quiet {shlex.quote(a.range)}").returncode != 0:
+            print(f"asgard lint: bad revision range '{a.range}'", file=sys.stderr)
+            sys.exit(2)
+        commits = g.iter_log(head=shlex.quote(a.range), index=())
+        try:
+            hashes, violations = lint(commits, a.jobs)
+        finally:
+            commits.close()
+    finally:
+        g.close()
+
+    if a.format == "json":
+        report = json.dumps(
+            {"range": a.range, "commits": len(hashes), "violations": violations},
+            indent=2,
+        )
+        report += "\n"
+    elif a.format == "junit":
+        report = junit_report(a.range, hashes, violations)
+    else:
+        report = "".join(
+            f"{v['hash'][:12]} {v['rule']}: {v['error']}\n    {v['header']}\n"
+            for v in violations
+        )
+    if a.output and a.output != "-":
+        with open(a.output, "w", encoding="utf-8") as f:
+            f.write(report)
+    else:
+        sys.stdout.write(report)
+    if violations:
+        print(
+            f"asgard lint: {len(violations)} of {len(hashes)} commits aren't "
+            "Conventional Commits-compliant",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        prog="asgard lint",
+        description="Check that every commit in RANGE has a Conventional Commits "
+        "message (merge, fixup! and squash! commits are skipped), exiting with "
+        "1 if any doesn't.",
+    )
+    parser.add_argument(
+        "range", metavar="RANGE", help="commits to check, e.g. 'main..HEAD'"
+    )
+    parser.add_argument(
+        "--repo-path", default=os.getcwd(), help="git repo path (defaults to '.')"
+    )
+    parser.add_argument(
+        "--format",
+        choices=("text", "json", "junit"),
+        default="text",
+        help="report format (defaults to text)",
+    )
+    parser.add_argument(
+        "--output", help="write the report to this file instead of stdout"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count(),
+        help="processes classifying long ranges (defaults to the CPU count)",
+    )
+    return parser.parse_args(args)
@@ -0,0 +1,92 @@
+"""Version state recorded in git notes, for later runs and clones to resume from."""
+
+import sys
+
+NOTES_REF = "refs/notes/asgard"
+
+
+class VersionNotes:
+    """Per-commit version state kept under a notes ref.
+
+    A commit's note records the tag its version builds on, the traversal
+    used, the bump level of the commits made since that tag and the version
+    itself. A later run finding a note in the history since the same tag
+    only classifies the commits made after the noted one. Notes are regular
+    git objects under their own ref, so they can be fetched and pushed to
+    share that work between clones.
+    """
+
+    header = "asgard-state 1"
+
+    def __init__(self, g, ref=NOTES_REF):
+        self.g = g
+        self.ref = ref
+        self._blobs = None
+
+    def blobs(self):
+        """Returns {commit hash: note blob hash}, listing the ref once."""
+        if self._blobs is None:
+            self._blobs = {}
+            res = self.g.git(f"notes --ref={self.ref} list")
+            for line in res.stdout.decode().splitlines():
+                blob, commit_hash = line.split()
+                self._blobs[commit_hash] = blob
+        return self._blobs
+
+    def get(self, commit_hash):
+        """Returns the state noted on a commit as a dict, or None."""
+        blob = self.blobs().get(commit_hash)
+        obj = self.g.read_object(blob) if blob else None
+        if obj is None or obj[0] != "blob":
+            return None
+        lines = obj[1].decode(errors="replace").splitlines()
+        if not lines or lines[0] != self.header:
+            return None
+        state = {}
+        for line in lines[1:]:
+            key, sep, value = line.partition(" ")
+            if sep:
+                state[key] = value
+        return state
+
+    def find(self, hashes, tag, traversal):
+        """Returns (hash, state) for the first of hashes with a usable note.
+
+        hashes are those of the commits (newest first) since tag; a note is usable if
+        it was made from the same tag with the same traversal.
+        """
+        if not self.blobs():
+            return None
+        for commit_hash in hashes:
+            if commit_hash not in self._blobs:
+                continue
+            state = self.get(commit_hash)
+            if (
+                state is not None
+                and state.get("tag") == tag
+                and state.get("traversal") == traversal
+                and state.get("bump") in ("micro", "minor", "major")
+            ):
+                return commit_hash, state
+        return None
+
+    def put(self, commit_hash, state):
+        """Notes state on a commit, replacing any previous note."""
+        lines = [self.header] + [f"{key} {value}" for key, value in state.items()]
+        self.g.add_note(commit_hash, "\n".join(lines) + "\n", self.ref)
+        self._blobs = None
+
+    def fetch(self, remote):
+        """Replaces the local notes with the remote's, if it has any."""
+        try:
+            self.g.fetch(remote, f"+{self.ref}:{self.ref}")
+        except RuntimeError as e:
+            print(f"WARNING: {e}", file=sys.stderr)
+        self._blobs = None
+
+    def push(self, remote):
+        """Pushes the notes; a rejected push (another run won) only warns."""
+        try:
+            self.g.push(remote, f"{self.ref}:{self.ref}")
+        except RuntimeError as e:
+            print(f"WARNING: {e}", file=sys.stderr)
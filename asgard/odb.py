@@ -0,0 +1,479 @@
+"""Read-only access to a git object database, without spawning git."""
+
+import heapq
+import mmap
+import os
+import struct
+import zlib
+
+OBJ_COMMIT, OBJ_TREE, OBJ_BLOB, OBJ_TAG = 1, 2, 3, 4
+OBJ_OFS_DELTA, OBJ_REF_DELTA = 6, 7
+TYPE_NAMES = {
+    b"commit": OBJ_COMMIT,
+    b"tree": OBJ_TREE,
+    b"blob": OBJ_BLOB,
+    b"tag": OBJ_TAG,
+}
+
+
+class Pack:
+    """A packfile and its version 2 index, both mmap'd."""
+
+    def __init__(self, idx_path):
+        self.idx = self._mmap(idx_path)
+        self.pack = self._mmap(idx_path[: -len(".idx")] + ".pack")
+        if self.idx[:8] != b"\377tOc\0\0\0\2":
+            raise ValueError(f"Unsupported pack index format: {idx_path}")
+        self.fanout = struct.unpack_from(">256I", self.idx, 8)
+        self.count = self.fanout[255]
+        self.names_offset = 8 + 256 * 4
+        self.offsets_offset = self.names_offset + self.count * 24
+        self.large_offsets_offset = self.offsets_offset + self.count * 4
+
+    @staticmethod
+    def _mmap(path):
+        with open(path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        self.idx.close()
+        self.pack.close()
+
+    def find(self, oid):
+        """Returns the pack offset of a raw 20-byte object id, or None."""
+        lo = self.fanout[oid[0] - 1] if oid[0] else 0
+        hi = self.fanout[oid[0]]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = self.names_offset + mid * 20
+            name = self.idx[pos : pos + 20]
+            if name < oid:
+                lo = mid + 1
+            elif name > oid:
+                hi = mid
+            else:
+                (offset,) = struct.unpack_from(
+                    ">I", self.idx, self.offsets_offset + mid * 4
+                )
+                if offset & 0x80000000:
+                    (offset,) = struct.unpack_from(
+                        ">Q",
+                        self.idx,
+                        self.large_offsets_offset + (offset & 0x7FFFFFFF) * 8,
+                    )
+                return offset
+        return None
+
+    def inflate(self, offset, size):
+        d = zlib.decompressobj()
+        out = []
+        chunk = max(size, 64) + 64
+        while not d.eof:
+            data = self.pack[offset : offset + chunk]
+            if not data:
+                raise ValueError("Truncated packfile")
+            out.append(d.decompress(data))
+            offset += chunk
+        return b"".join(out)
+
+    def read_header(self, offset):
+        """Returns (type, size, data offset, delta base) for the entry at offset."""
+        c = self.pack[offset]
+        offset += 1
+        obj_type = (c >> 4) & 7
+        size = c & 15
+        shift = 4
+        while c & 0x80:
+            c = self.pack[offset]
+            offset += 1
+            size |= (c & 0x7F) << shift
+            shift += 7
+        base = None
+        if obj_type == OBJ_OFS_DELTA:
+            c = self.pack[offset]
+            offset += 1
+            rel = c & 0x7F
+            while c & 0x80:
+                c = self.pack[offset]
+                offset += 1
+                rel = ((rel + 1) << 7) | (c & 0x7F)
+            base = rel
+        elif obj_type == OBJ_REF_DELTA:
+            base = bytes(self.pack[offset : offset + 20])
+            offset += 20
+        return obj_type, size, offset, base
+
+
+def apply_delta(base, delta):
+    def varint(pos):
+        value, shift = 0, 0
+        while True:
+            c = delta[pos]
+            pos += 1
+            value |= (c & 0x7F) << shift
+            shift += 7
+            if not c & 0x80:
+                return value, pos
+
+    src_size, pos = varint(0)
+    dst_size, pos = varint(pos)
+    if src_size != len(base):
+        raise ValueError("Delta base size mismatch")
+    out = bytearray()
+    end = len(delta)
+    while pos < end:
+        op = delta[pos]
+        pos += 1
+        if op & 0x80:
+            offset, size = 0, 0
+            for i in range(4):
+                if op & (1 << i):
+                    offset |= delta[pos] << (8 * i)
+                    pos += 1
+            for i in range(3):
+                if op & (1 << (4 + i)):
+                    size |= delta[pos] << (8 * i)
+                    pos += 1
+            out += base[offset : offset + (size or 0x10000)]
+        elif op:
+            out += delta[pos : pos + op]
+            pos += op
+        else:
+            raise ValueError("Invalid delta opcode")
+    if len(out) != dst_size:
+        raise ValueError("Delta result size mismatch")
+    return bytes(out)
+
+
+class ObjectDatabase:
+    """Reads loose and packed objects from a git dir's objects directory."""
+
+    def __init__(self, objects_dir):
+        self.objects_dirs = [objects_dir]
+        alternates = os.path.join(objects_dir, "info", "alternates")
+        if os.path.exists(alternates):
+            with open(alternates) as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        self.objects_dirs.append(
+                            os.path.normpath(os.path.join(objects_dir, line))
+                        )
+        self.packs = None
+        self.base_cache = {}
+
+    def _load_packs(self):
+        self.packs = []
+        for objects_dir in self.objects_dirs:
+            pack_dir = os.path.join(objects_dir, "pack")
+            if not os.path.isdir(pack_dir):
+                continue
+            for name in sorted(os.listdir(pack_dir)):
+                path = os.path.join(pack_dir, name)
+                if name.endswith(".idx") and os.path.getsize(path) > 0:
+                    self.packs.append(Pack(path))
+
+    def close(self):
+        for pack in self.packs or ():
+            pack.close()
+        self.packs = None
+        self.base_cache = {}
+
+    def read(self, oid):
+        """Returns (type, data) for a hex object id."""
+        if self.packs is None:
+            self._load_packs()
+        raw_oid = bytes.fromhex(oid)
+        for pack in self.packs:
+            offset = pack.find(raw_oid)
+            if offset is not None:
+                return self._read_packed(pack, offset)
+        for objects_dir in self.objects_dirs:
+            path = os.path.join(objects_dir, oid[:2], oid[2:])
+            try:
+                with open(path, "rb") as f:
+                    raw = zlib.decompress(f.read())
+            except FileNotFoundError:
+                continue
+            header, _, data = raw.partition(b"\0")
+            return TYPE_NAMES[header.split(b" ")[0]], data
+        raise KeyError(oid)
+
+    def _read_packed(self, pack, offset):
+        cached = self.base_cache.get((id(pack), offset))
+        if cached is not None:
+            return cached
+        obj_type, size, data_offset, base = pack.read_header(offset)
+        data = pack.inflate(data_offset, size)
+        if obj_type == OBJ_OFS_DELTA:
+            base_type, base_data = self._read_packed(pack, offset - base)
+            obj_type, data = base_type, apply_delta(base_data, data)
+        elif obj_type == OBJ_REF_DELTA:
+            base_type, base_data = self.read(base.hex())
+            obj_type, data = base_type, apply_delta(base_data, data)
+        if len(self.base_cache) >= 256:
+            self.base_cache.clear()
+        self.base_cache[(id(pack), offset)] = (obj_type, data)
+        return obj_type, data
+
+
+def parse_tree(data):
+    """Returns {name: (is_tree, mode, hash)} for raw tree data."""
+    entries = {}
+    pos = 0
+    while pos < len(data):
+        space = data.index(b" ", pos)
+        nul = data.index(b"\0", space)
+        mode = data[pos:space]
+        name = data[space + 1 : nul].decode(errors="surrogateescape")
+        entries[name] = (mode == b"40000", mode, data[nul + 1 : nul + 21].hex())
+        pos = nul + 21
+    return entries
+
+
+def parse_commit(data):
+    """Returns (parents, committer timestamp, message) for raw commit data."""
+    headers, _, message = data.partition(b"\n\n")
+    parents = []
+    timestamp = 0
+    for line in headers.split(b"\n"):
+        if line.startswith(b"parent "):
+            parents.append(line[7:].decode())
+        elif line.startswith(b"committer "):
+            timestamp = int(line.rsplit(b" ", 2)[1])
+    return parents, timestamp, message.decode(errors="replace")
+
+
+class NativeRepo:
+    """Refs and commit history read straight from a git dir."""
+
+    def __init__(self, git_dir, common_dir=None):
+        self.git_dir = git_dir
+        self.common_dir = common_dir or git_dir
+        self.odb = ObjectDatabase(os.path.join(self.common_dir, "objects"))
+        self._packed_refs = None
+        self._shallow = None
+
+    def close(self):
+        self.odb.close()
+        self._packed_refs = None
+        self._shallow = None
+
+    def shallow(self):
+        """Returns the hashes of a shallow clone's boundary commits.
+
+        Their parents were never fetched, so they're treated as root commits.
+        """
+        if self._shallow is None:
+            try:
+                with open(os.path.join(self.common_dir, "shallow")) as f:
+                    self._shallow = set(f.read().split())
+            except FileNotFoundError:
+                self._shallow = set()
+        return self._shallow
+
+    def packed_refs(self):
+        """Returns {refname: (hash, peeled hash or None)} from packed-refs."""
+        if self._packed_refs is None:
+            self._packed_refs = {}
+            try:
+                with open(os.path.join(self.common_dir, "packed-refs")) as f:
+                    last = None
+                    for line in f:
+                        line = line.rstrip("\n")
+                        if not line or line.startswith("#"):
+                            continue
+                        if line.startswith("^"):
+                            self._packed_refs[last] = (
+                                self._packed_refs[last][0],
+                                line[1:],
+                            )
+                            continue
+                        oid, _, last = line.partition(" ")
+                        self._packed_refs[last] = (oid, None)
+            except FileNotFoundError:
+                pass
+        return self._packed_refs
+
+    def resolve(self, ref="HEAD"):
+        """Returns the hash a ref points at, following symbolic refs, or None."""
+        for _ in range(10):
+            base = self.git_dir if ref == "HEAD" else self.common_dir
+            try:
+                with open(os.path.join(base, ref)) as f:
+                    value = f.read().strip()
+            except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+                entry = self.packed_refs().get(ref)
+                return entry[0] if entry else None
+            if not value.startswith("ref: "):
+                return value
+            ref = value[len("ref: ") :]
+        return None
+
+    def refs(self, prefix="refs/tags/"):
+        """Yields (refname, hash, peeled hash or None) for refs under prefix."""
+        loose = {}
+        root = os.path.join(self.common_dir, prefix)
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                refname = prefix + os.path.relpath(path, root).replace(os.sep, "/")
+                with open(path) as f:
+                    loose[refname] = f.read().strip()
+        for refname, (oid, peeled) in self.packed_refs().items():
+            if refname.startswith(prefix) and refname not in loose:
+                yield refname, oid, peeled
+        for refname, oid in loose.items():
+            yield refname, oid, None
+
+    def peel(self, oid):
+        """Follows annotated tag objects down to the object they point at."""
+        while True:
+            obj_type, data = self.odb.read(oid)
+            if obj_type != OBJ_TAG:
+                return oid
+            oid = data[len(b"object ") : data.index(b"\n")].decode()
+
+    def commit(self, oid):
+        obj_type, data = self.odb.read(oid)
+        if obj_type != OBJ_COMMIT:
+            raise ValueError(f"{oid} is not a commit")
+        parents, timestamp, message = parse_commit(data)
+        if parents and oid in self.shallow():
+            parents = []
+        return parents, timestamp, message
+
+    def tree(self, oid):
+        if oid is None:
+            return {}
+        obj_type, data = self.odb.read(oid)
+        if obj_type != OBJ_TREE:
+            raise ValueError(f"{oid} is not a tree")
+        return parse_tree(data)
+
+    def diff_trees(self, old, new, prefix=""):
+        """Returns the paths of files that differ between two trees."""
+        old_entries, new_entries = self.tree(old), self.tree(new)
+        changed = {}
+        for name in set(old_entries) | set(new_entries):
+            o, n = old_entries.get(name), new_entries.get(name)
+            if o != n:
+                changed[name] = (o, n)
+        paths = []
+        # Git orders directories as if their names ended with a slash.
+        for name in sorted(
+            changed, key=lambda k: k + "/" if any(e and e[0] for e in changed[k]) else k
+        ):
+            o, n = changed[name]
+            path = prefix + name
+            if (o and not o[0]) or (n and not n[0]):
+                paths.append(path)
+            old_tree = o[2] if o and o[0] else None
+            new_tree = n[2] if n and n[0] else None
+            if old_tree or new_tree:
+                paths.extend(self.diff_trees(old_tree, new_tree, path + "/"))
+        return paths
+
+    def changed_paths(self, oid):
+        """Returns the files a commit changed relative to its only parent.
+
+        Merges report no files, like git log --name-only does.
+        """
+        obj_type, data = self.odb.read(oid)
+        headers = data.partition(b"\n\n")[0].split(b"\n")
+        tree = headers[0][len(b"tree ") :].decode()
+        parents = [line[7:].decode() for line in headers if line.startswith(b"parent ")]
+        if len(parents) > 1:
+            return []
+        parent_tree = None
+        if parents and oid not in self.shallow():
+            _, parent_data = self.odb.read(parents[0])
+            parent_tree = parent_data[len(b"tree ") : parent_data.index(b"\n")].decode()
+        return self.diff_trees(parent_tree, tree)
+
+    def reachable(self, head, targets):
+        """Returns the subset of targets that are ancestors of head (or head).
+
+        The walk stops as soon as every target has been found.
+        """
+        found = set()
+        if head is None:
+            return found
+        remaining = set(targets)
+        stack = [head]
+        seen = {head}
+        while stack and remaining:
+            oid = stack.pop()
+            if oid in remaining:
+                remaining.discard(oid)
+                found.add(oid)
+            for parent in self.commit(oid)[0]:
+                if parent not in seen:
+                    seen.add(parent)
+                    stack.append(parent)
+        return found
+
+    def walk(self, heads, exclude=(), first_parent=False, with_parents=False):
+        """Yields (hash, message) newest first, like a plain git log.
+
+        Commits reachable from exclude are left out, the same way git log
+        handles "exclude..head" ranges: the walk runs until only excluded
+        commits are left queued, and commits found to be excluded along the
+        way are dropped before anything is yielded. With first_parent, as
+        with git log --first-parent, only the first parent of commits that
+        aren't excluded is followed. With with_parents, (hash, message, parents)
+        triples are yielded instead.
+        """
+        queue = []
+        seen = {}
+        parents_of = {}
+        limited = []
+        counter = 0
+
+        def mark_uninteresting(oid):
+            stack = [oid]
+            while stack:
+                oid = stack.pop()
+                if not seen.get(oid, True):
+                    seen[oid] = True
+                    stack.extend(parents_of.get(oid, ()))
+
+        starts = [(h, False) for h in heads] + [(h, True) for h in exclude]
+        for oid, uninteresting in starts:
+            if oid is None:
+                continue
+            if oid in seen:
+                if uninteresting:
+                    mark_uninteresting(oid)
+                continue
+            seen[oid] = uninteresting
+            parents, timestamp, message = self.commit(oid)
+            parents_of[oid] = parents
+            heapq.heappush(queue, (-timestamp, counter, oid, message))
+            counter += 1
+        while queue and not all(seen[entry[2]] for entry in queue):
+            _, _, oid, message = heapq.heappop(queue)
+            uninteresting = seen[oid]
+            parents = parents_of[oid]
+            if first_parent and not uninteresting:
+                parents = parents[:1]
+            for parent in parents:
+                if parent in seen:
+                    if uninteresting:
+                        mark_uninteresting(parent)
+                    continue
+                seen[parent] = uninteresting
+                p_parents, p_timestamp, p_message = self.commit(parent)
+                parents_of[parent] = p_parents
+                heapq.heappush(queue, (-p_timestamp, counter, parent, p_message))
+                counter += 1
+            if uninteresting:
+                continue
+            entry = (oid, message, parents_of[oid]) if with_parents else (oid, message)
+            if exclude:
+                limited.append(entry)
+            else:
+                yield entry
+        for entry in limited:
+            if not seen[entry[0]]:
+                yield entry
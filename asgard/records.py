@@ -0,0 +1,109 @@
+"""Compact, columnar commit logs for very long histories."""
+
+from array import array
+
+
+class CommitLog:
+    """Commits classified once, then stored in a few flat columns.
+
+    Each commit costs 20 bytes of raw hash and an index into a table of
+    interned Conventional Commits types ("BREAKING CHANGE" for breaking
+    changes, None for non-compliant messages). Tags are kept in a dict of the
+    few positions that have one. Messages aren't kept at all: they're read
+    back from the repo when a consumer asks for one.
+
+    Commits are appended newest first, as git log yields them, and indexed
+    oldest first, like GitRepo.log's tuples. Items are Commit views that also
+    answer the record dict keys ("hash", "message", "tag").
+    """
+
+    def __init__(self, repo):
+        self.repo = repo
+        self.hashes = bytearray()
+        self.type_ids = array("I")
+        self.types = [None]
+        self._type_ids = {None: 0}
+        self.tags = {}
+
+    def append(self, commit_hash, msg_type, tag=None):
+        """Adds a commit older than the ones already in the log."""
+        if msg_type not in self._type_ids:
+            self._type_ids[msg_type] = len(self.types)
+            self.types.append(msg_type)
+        if tag is not None:
+            self.tags[len(self.type_ids)] = tag
+        self.hashes += bytes.fromhex(commit_hash)
+        self.type_ids.append(self._type_ids[msg_type])
+
+    def __len__(self):
+        return len(self.type_ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [Commit(self, j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("commit index out of range")
+        return Commit(self, i)
+
+    def _position(self, i):
+        # Stored newest first, indexed oldest first.
+        return len(self.type_ids) - 1 - i
+
+
+class Commit:
+    """One commit of a CommitLog, with the record dict interface on top."""
+
+    __slots__ = ("log", "i")
+
+    def __init__(self, log, i):
+        self.log = log
+        self.i = i
+
+    @property
+    def hash(self):
+        position = self.log._position(self.i)
+        return self.log.hashes[position * 20 : position * 20 + 20].hex()
+
+    @property
+    def msg_type(self):
+        """The commit's Conventional Commits type, or None if non-compliant."""
+        return self.log.types[self.log.type_ids[self.log._position(self.i)]]
+
+    @property
+    def breaking(self):
+        return self.msg_type == "BREAKING CHANGE"
+
+    @property
+    def tag(self):
+        return self.log.tags.get(self.log._position(self.i))
+
+    @property
+    def message(self):
+        return self.log.repo.message(self.hash)
+
+    def keys(self):
+        return ("hash", "message", "tag") if self.tag else ("hash", "message")
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def __getitem__(self, key):
+        if key not in self.keys():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return self[key] if key in self.keys() else default
+
+    def __eq__(self, other):
+        if isinstance(other, Commit):
+            return self.hash == other.hash
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.hash)
+
+    def __repr__(self):
+        return f"Commit({self.hash[:7]}, {self.msg_type!r}, tag={self.tag!r})"
@@ -1,10 +1,32 @@
+import functools
 import re
 
 
+@functools.total_ordering
 class SemVer:
+    """A version number, ordered by SemVer 2.0 precedence.
+
+    Versions compare by major, minor and micro, then a prerelease sorts
+    before the release it precedes, and prereleases sort by suffix (ASCII)
+    and then suffix number. Versions that only differ in formatting (dash,
+    dot) have the same precedence and are ordered by their string form.
+    Hashing follows the string form too, so don't mutate a version while it
+    is in a set or used as a dict key.
+    """
+
+    __slots__ = (
+        "major",
+        "minor",
+        "micro",
+        "suffix_dash_prefix",
+        "suffix",
+        "suffix_dot_suffix",
+        "suffix_number",
+    )
     regex_pattern = (
         r"^(0|[1-9]+0*)\.(0|[1-9]+0*)\.(0|[1-9]+0*)((-)?([a-zA-Z]+)(\.)?(0|[1-9]+0*))?$"
     )
+    regex = re.compile(regex_pattern)
 
     def __init__(
         self,
@@ -35,30 +57,40 @@ class SemVer:
 
     @classmethod
     def fromstr(cls, str):
-        if not re.match(cls.regex_pattern, str):
+        s = cls.regex.match(str)
+        if not s:
             raise ValueError()
-        s = re.search(cls.regex_pattern, str)
-        suffix_dash_prefix = False
-        suffix = None
-        suffix_dot_suffix = False
-        suffix_number = None
-        if s.group(5):
-            suffix_dash_prefix = True
-        if s.group(6):
-            suffix = s.group(6)
-        if s.group(7):
-            suffix_dot_suffix = True
-        if s.group(8):
-            suffix_number = int(s.group(8))
-        return cls(
-            major=s.group(1),
-            minor=s.group(2),
-            micro=s.group(3),
-            suffix_dash_prefix=suffix_dash_prefix,
-            suffix=suffix,
-            suffix_dot_suffix=suffix_dot_suffix,
-            suffix_number=suffix_number,
-        )
+        return cls._frommatch(s)
+
+    @classmethod
+    def parse_many(cls, strs, skip_invalid=True):
+        """Parses many version strings at once.
+
+        Invalid strings are skipped, or raise ValueError if skip_invalid is
+        False.
+        """
+        match = cls.regex.match
+        versions = []
+        for str in strs:
+            s = match(str)
+            if s:
+                versions.append(cls._frommatch(s))
+            elif not skip_invalid:
+                raise ValueError(str)
+        return versions
+
+    @classmethod
+    def _frommatch(cls, s):
+        # The pattern already guarantees valid numbers, so skip __init__.
+        v = cls.__new__(cls)
+        v.major = int(s.group(1))
+        v.minor = int(s.group(2))
+        v.micro = int(s.group(3))
+        v.suffix_dash_prefix = s.group(5) is not None
+        v.suffix = s.group(6)
+        v.suffix_dot_suffix = s.group(7) is not None
+        v.suffix_number = int(s.group(8)) if s.group(8) else None
+        return v
 
     def increment_major(self):
         self.major += 1
@@ -82,10 +114,25 @@ class SemVer:
 
     @classmethod
     def isvalid(cls, subject):
-        if re.match(cls.regex_pattern, subject):
+        if cls.regex.match(subject):
             return True
         return False
 
+    def precedence(self):
+        """Returns a sort key following SemVer 2.0 precedence.
+
+        Sorting with key=SemVer.precedence is faster than comparing versions
+        directly, which also orders equal-precedence versions by string form.
+        """
+        return (
+            self.major,
+            self.minor,
+            self.micro,
+            self.suffix is None,
+            self.suffix or "",
+            int(self.suffix_number or 0),
+        )
+
     def __repr__(self):
         rv = f"{self.major}.{self.minor}.{self.micro}"
         if self.suffix_dash_prefix:
@@ -101,3 +148,15 @@ class SemVer:
     def __eq__(self, other):
         if self.__repr__() == other or self.__repr__() == other.__repr__():
             return True
+        return False
+
+    def __hash__(self):
+        return hash(self.__repr__())
+
+    def __lt__(self, other):
+        if not isinstance(other, SemVer):
+            return NotImplemented
+        key, other_key = self.precedence(), other.precedence()
+        if key != other_key:
+            return key < other_key
+        return self.__repr__() < other.__repr__()
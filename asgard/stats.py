@@ -0,0 +1,97 @@
+"""Per-phase timings and counters for --stats.
+
+Collection is off unless start() was called; phase() and count() are then
+near no-ops, so they can sit on hot paths.
+
+Phase times are exclusive: while a nested phase runs, the enclosing one's
+clock is stopped. Phases therefore add up to the total wall time, which
+matters since history reading and classification interleave.
+"""
+
+import contextlib
+import time
+
+_active = None
+
+
+class Stats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.counters = {
+            "git_processes": 0,
+            "git_bytes_read": 0,
+            "commits_examined": 0,
+        }
+        self._stack = []
+        self._mark = self.started
+
+    def _charge(self):
+        now = time.perf_counter()
+        if self._stack:
+            name = self._stack[-1]
+            self.phases[name] = self.phases.get(name, 0.0) + now - self._mark
+        self._mark = now
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        self._charge()
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._charge()
+            self._stack.pop()
+
+    def timed_iter(self, name, iterable):
+        """Yields from iterable, charging the time spent in it to phase name."""
+        it = iter(iterable)
+        end = object()
+        try:
+            while True:
+                with self.phase(name):
+                    item = next(it, end)
+                if item is end:
+                    return
+                yield item
+        finally:
+            close = getattr(it, "close", None)
+            if close is not None:
+                close()
+
+    def as_dict(self):
+        return {
+            "total_seconds": time.perf_counter() - self.started,
+            "phases": self.phases,
+            "counters": self.counters,
+        }
+
+
+def start():
+    """Starts collecting, returning the Stats instance that will be filled."""
+    global _active
+    _active = Stats()
+    return _active
+
+
+def stop():
+    global _active
+    _active = None
+
+
+def phase(name):
+    """Context manager timing its body as phase name, if collecting."""
+    if _active is None:
+        return contextlib.nullcontext()
+    return _active.phase(name)
+
+
+def timed_iter(name, iterable):
+    if _active is None:
+        return iterable
+    return _active.timed_iter(name, iterable)
+
+
+def count(counter, n=1):
+    if _active is not None:
+        _active.counters[counter] += n
@@ -0,0 +1,74 @@
+"""Index of the semver tags in a repo, keyed by the commit they point at."""
+
+from asgard.semver import SemVer
+
+
+def _version(tag):
+    return SemVer.fromstr(tag.replace("v", ""))
+
+
+class TagIndex:
+    """Maps commit hashes to every semver tag pointing at them.
+
+    Built from (commit hash, tag name) pairs with annotated tags already
+    peeled; tags that aren't semver versions (with an optional "v") are left
+    out. With a prefix (e.g. "pkg-a/"), only tags starting with it are kept,
+    and they're stored with the prefix removed. Each commit's tags are sorted
+    highest version first.
+    """
+
+    def __init__(self, tags=(), prefix=""):
+        self.by_commit = {}
+        for commit_hash, tag in tags:
+            if not tag.startswith(prefix):
+                continue
+            tag = tag[len(prefix) :]
+            if SemVer.isvalid(tag.replace("v", "")):
+                self.by_commit.setdefault(commit_hash, []).append(tag)
+        for commit_tags in self.by_commit.values():
+            commit_tags.sort(key=_version, reverse=True)
+        self._buckets = None
+
+    def __len__(self):
+        return len(self.by_commit)
+
+    def __contains__(self, commit_hash):
+        return commit_hash in self.by_commit
+
+    def tags(self, commit_hash):
+        return self.by_commit.get(commit_hash, [])
+
+    def tag(self, commit_hash):
+        """Returns the highest semver tag on a commit, or None."""
+        commit_tags = self.by_commit.get(commit_hash)
+        return commit_tags[0] if commit_tags else None
+
+    def buckets(self):
+        """Returns {suffix: [(precedence, tag, commit hash), ...]}, sorted.
+
+        Releases are under the None suffix. Built once, on first use.
+        """
+        if self._buckets is None:
+            self._buckets = {}
+            for commit_hash, commit_tags in self.by_commit.items():
+                for tag in commit_tags:
+                    version = _version(tag)
+                    self._buckets.setdefault(version.suffix, []).append(
+                        (version.precedence(), tag, commit_hash)
+                    )
+            for bucket in self._buckets.values():
+                bucket.sort()
+        return self._buckets
+
+    def highest(self, suffix=None):
+        """Returns (hash, tag) for the highest release or suffix prerelease.
+
+        Prereleases with other suffixes are ignored. Returns None if there
+        are none.
+        """
+        best = None
+        for bucket_suffix in {None, suffix}:
+            bucket = self.buckets().get(bucket_suffix)
+            if bucket and (best is None or bucket[-1] > best):
+                best = bucket[-1]
+        return (best[2], best[1]) if best else None
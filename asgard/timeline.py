@@ -0,0 +1,220 @@
+"""Timeline mode: the version every commit would produce, and shipped in."""
+
+import argparse
+import os
+import sys
+from array import array
+
+from asgard.app import (
+    BUMPS,
+    add_inference_args,
+    bump_version,
+    classify,
+    open_cache,
+    open_repo,
+)
+
+LEVELS = {"BREAKING CHANGE": 2, "feat": 1}
+
+
+class Timeline:
+    """Per-commit versions for a whole history, parents before children.
+
+    For each commit, vnext(X) is what inferring a version with X checked
+    out would produce, and release(X) is the first tag whose history
+    contains X. Hashes are kept as 20-byte strings and versions as indices
+    into small tables, so memory stays low even for very long histories.
+    """
+
+    def __init__(self):
+        self.hashes = []
+        self.versions = []
+        self.releases = []
+        self.vnext_of = array("I")
+        self.release_of = array("i")
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def __contains__(self, commit_hash):
+        return bytes.fromhex(commit_hash) in self.positions
+
+    def _position(self, commit_hash):
+        try:
+            return self.positions[bytes.fromhex(commit_hash)]
+        except (KeyError, ValueError):
+            raise KeyError(commit_hash) from None
+
+    def vnext(self, commit_hash):
+        return self.versions[self.vnext_of[self._position(commit_hash)]]
+
+    def release(self, commit_hash):
+        """Returns the tag of the first release containing the commit, or None."""
+        release = self.release_of[self._position(commit_hash)]
+        return self.releases[release] if release >= 0 else None
+
+    def __iter__(self):
+        """Yields (hash, vnext, release tag or None), parents before children."""
+        for i, oid in enumerate(self.hashes):
+            release = self.release_of[i]
+            yield (
+                oid.hex(),
+                self.versions[self.vnext_of[i]],
+                self.releases[release] if release >= 0 else None,
+            )
+
+
+def topological_order(parents):
+    """Returns commit indices with every commit after its parents.
+
+    parents[i] lists the indices of commit i's parents. Commits are read
+    newest first, so roots are visited from the last one read, which keeps
+    linear histories in their original, oldest first, order.
+    """
+    order = []
+    visited = bytearray(len(parents))
+    for root in range(len(parents) - 1, -1, -1):
+        stack = [root]
+        while stack:
+            i = stack[-1]
+            if visited[i] == 0:
+                visited[i] = 1
+                stack.extend(p for p in reversed(parents[i]) if not visited[p])
+                continue
+            stack.pop()
+            if visited[i] == 1:
+                visited[i] = 2
+                order.append(i)
+    return order
+
+
+def build_timeline(
+    commits, suffix=None, suffix_dot_suffix=False, suffix_dash_prefix=False, cache=None
+):
+    """Builds a Timeline from commit records with parents.
+
+    Records are what iter_log(parents=True) yields. They're read once and
+    reduced to (hash, parents, tag, bump level) as they stream by. Commits
+    are then visited parents first, each one carrying the latest tag and the
+    highest bump since it from its parents. At a merge of branches built on
+    different tags, the tag found last in that order wins, and the bumps of
+    the other branches count in full. Since the version only depends on
+    that pair, each distinct one is computed once.
+
+    Releases are assigned by ancestry: tags are taken oldest first, and each
+    one claims the commits of its history no earlier tag has claimed.
+    """
+    timeline = Timeline()
+    hashes, parent_hashes, tags = [], [], {}
+    levels = bytearray()
+    for commit in commits:
+        if "tag" in commit:
+            tags[len(hashes)] = commit["tag"]
+        try:
+            levels.append(LEVELS.get(classify(commit, cache), 0))
+        except Exception:
+            levels.append(0)
+        hashes.append(bytes.fromhex(commit["hash"]))
+        parent_hashes.append(commit["parents"])
+    read_at = {oid: i for i, oid in enumerate(hashes)}
+    # Parents outside of the records (past a shallow boundary) are dropped.
+    parents = [
+        [read_at[p] for p in map(bytes.fromhex, commit_parents) if p in read_at]
+        for commit_parents in parent_hashes
+    ]
+    del parent_hashes
+    order = topological_order(parents)
+    position = array("i", bytes(4 * len(order)))
+    for pos, i in enumerate(order):
+        position[i] = pos
+
+    # (position of the tagged commit or -1, highest level since) per commit.
+    state_of = [None] * len(order)
+    vnext_of = array("I", bytes(4 * len(order)))
+    version_ids = {}
+    for i in order:
+        if i in tags:
+            state = (position[i], 0)
+        else:
+            tag_pos, level = -1, levels[i]
+            for p in parents[i]:
+                p_tag_pos, p_level = state_of[p]
+                tag_pos = max(tag_pos, p_tag_pos)
+                level = max(level, p_level)
+            state = (tag_pos, level)
+        state_of[i] = state
+        if state not in version_ids:
+            version_ids[state] = len(timeline.versions)
+            tag_pos, level = state
+            version = bump_version(
+                tags[order[tag_pos]] if tag_pos >= 0 else None,
+                BUMPS[level],
+                suffix=suffix,
+                suffix_dot_suffix=suffix_dot_suffix,
+                suffix_dash_prefix=suffix_dash_prefix,
+            )
+            timeline.versions.append(str(version))
+        vnext_of[i] = version_ids[state]
+    del state_of
+
+    release_of = [-1] * len(order)
+    for i in sorted(tags, key=position.__getitem__):
+        timeline.releases.append(tags[i])
+        release = len(timeline.releases) - 1
+        stack = [i]
+        while stack:
+            j = stack.pop()
+            if release_of[j] < 0:
+                release_of[j] = release
+                stack.extend(p for p in parents[j] if release_of[p] < 0)
+
+    timeline.hashes = [hashes[i] for i in order]
+    timeline.vnext_of = array("I", (vnext_of[i] for i in order))
+    timeline.release_of = array("i", (release_of[i] for i in order))
+    timeline.positions = {oid: pos for pos, oid in enumerate(timeline.hashes)}
+    return timeline
+
+
+def main(args=sys.argv[1:]):
+    a = parse_args(args)
+    with open_repo(a.repo_path, a.backend, read_only=True) as g:
+        cache = open_cache(g) if a.cache else None
+        timeline = build_timeline(
+            g.iter_log(parents=True),
+            suffix=a.prerelease_suffix,
+            suffix_dot_suffix=a.suffix_dot_suffix,
+            suffix_dash_prefix=a.suffix_dash_prefix,
+            cache=cache,
+        )
+        if cache is not None and not g.read_only:
+            cache.flush()
+        commit_hashes = [g.resolve_commit(rev) for rev in a.revs]
+    if not a.revs:
+        for commit_hash, vnext, release in timeline:
+            print(commit_hash, vnext, release or "-")
+        return
+    failed = False
+    for rev, commit_hash in zip(a.revs, commit_hashes):
+        if commit_hash is None or commit_hash not in timeline:
+            print(f"{rev}: not in the history of HEAD", file=sys.stderr)
+            failed = True
+            continue
+        print(rev, timeline.vnext(commit_hash), timeline.release(commit_hash) or "-")
+    if failed:
+        sys.exit(1)
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        prog="asgard timeline",
+        description="Print, for each commit (oldest first) or each REV given, "
+        "the version it would produce and the first release containing it "
+        "('-' if unreleased).",
+    )
+    parser.add_argument("revs", nargs="*", metavar="REV", help="commits to look up")
+    parser.add_argument(
+        "--repo-path", default=os.getcwd(), help="git repo path (defaults to '.')"
+    )
+    add_inference_args(parser)
+    return parser.parse_args(args)
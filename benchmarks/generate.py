@@ -0,0 +1,149 @@
+"""Generates large synthetic git repos quickly with git fast-import.
+
+python -m benchmarks.generate PATH --commits 100000 --tag-every 50
+"""
+
+import argparse
+import random
+import subprocess
+import sys
+
+CC_TYPES = ("feat", "fix", "chore", "docs", "refactor", "test", "perf", "ci")
+NON_CC_MESSAGES = (
+    "Merge pull request #{n} from someone/branch",
+    "WIP",
+    "Fixed the thing",
+    "Update README.md",
+    "FIX: shouting type",
+)
+
+
+def commit_message(rng, n, giant_every, giant_size):
+    if giant_every and n % giant_every == giant_every - 1:
+        body = "\n".join(
+            f"- squashed commit {i}: " + "x" * 60 for i in range(giant_size // 80)
+        )
+        return f"feat: squash merge {n}\n\n{body}\n"
+    roll = rng.random()
+    if roll < 0.2:
+        return rng.choice(NON_CC_MESSAGES).format(n=n) + "\n"
+    msg_type = rng.choice(CC_TYPES)
+    scope = f"(pkg{rng.randrange(20)})" if rng.random() < 0.3 else ""
+    msg = f"{msg_type}{scope}: change number {n}\n"
+    if rng.random() < 0.5:
+        msg += f"\nSome explanation of change {n}.\nIt spans two lines.\n"
+    if roll > 0.998:
+        msg += "\nBREAKING CHANGE: the old behaviour is gone\n"
+    return msg
+
+
+def fast_import_stream(
+    out,
+    commits,
+    tag_every,
+    annotated_every,
+    file_every,
+    giant_every,
+    giant_size,
+    seed,
+):
+    rng = random.Random(seed)
+    version = [0, 1, 0]
+    timestamp = 1500000000
+
+    def data(payload):
+        payload = payload.encode()
+        out.write(b"data %d\n" % len(payload))
+        out.write(payload)
+        out.write(b"\n")
+
+    for n in range(1, commits + 1):
+        timestamp += 60
+        out.write(b"commit refs/heads/master\nmark :%d\n" % n)
+        out.write(b"committer Bench <bench@example.com> %d +0000\n" % timestamp)
+        data(commit_message(rng, n, giant_every, giant_size))
+        if n > 1:
+            out.write(b"from :%d\n" % (n - 1))
+        if file_every and n % file_every == 0:
+            path = f"pkgs/pkg{rng.randrange(20)}/file{rng.randrange(50)}.txt"
+            out.write(b"M 644 inline %s\n" % path.encode())
+            data(f"content {n}\n")
+        if tag_every and n % tag_every == 0:
+            tag = "v%d.%d.%d" % tuple(version)
+            version[2] += 1
+            if rng.random() < 0.1:
+                version[1], version[2] = version[1] + 1, 0
+            if annotated_every and (n // tag_every) % annotated_every == 0:
+                out.write(b"tag %s\nfrom :%d\n" % (tag.encode(), n))
+                out.write(b"tagger Bench <bench@example.com> %d +0000\n" % timestamp)
+                data(f"release {tag}\n")
+            else:
+                out.write(b"reset refs/tags/%s\nfrom :%d\n\n" % (tag.encode(), n))
+
+
+def generate(path, commits, tag_every=50, annotated_every=4, file_every=3, **kwargs):
+    """Creates a repo at path with the requested synthetic history."""
+    subprocess.run(["git", "init", "-q", path], check=True)
+    proc = subprocess.Popen(
+        ["git", "fast-import", "--quiet"], stdin=subprocess.PIPE, cwd=path
+    )
+    fast_import_stream(
+        proc.stdin,
+        commits,
+        tag_every,
+        annotated_every,
+        file_every,
+        kwargs.get("giant_every", 0),
+        kwargs.get("giant_size", 200_000),
+        kwargs.get("seed", 0),
+    )
+    proc.stdin.close()
+    if proc.wait() != 0:
+        raise RuntimeError("git fast-import failed")
+    subprocess.run(
+        ["git", "symbolic-ref", "HEAD", "refs/heads/master"], check=True, cwd=path
+    )
+
+
+def main(args=sys.argv[1:]):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.generate")
+    parser.add_argument("path", help="where to create the repo")
+    parser.add_argument("--commits", type=int, default=10_000)
+    parser.add_argument(
+        "--tag-every", type=int, default=50, help="tag every N commits (0: never)"
+    )
+    parser.add_argument(
+        "--annotated-every",
+        type=int,
+        default=4,
+        help="make every Nth tag annotated (0: never)",
+    )
+    parser.add_argument(
+        "--file-every",
+        type=int,
+        default=3,
+        help="change a file every N commits; others are empty (0: never)",
+    )
+    parser.add_argument(
+        "--giant-every",
+        type=int,
+        default=5_000,
+        help="make every Nth message a giant squash message (0: never)",
+    )
+    parser.add_argument("--giant-size", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    a = parser.parse_args(args)
+    generate(
+        a.path,
+        a.commits,
+        a.tag_every,
+        a.annotated_every,
+        a.file_every,
+        giant_every=a.giant_every,
+        giant_size=a.giant_size,
+        seed=a.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
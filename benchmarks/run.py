@@ -0,0 +1,205 @@
+"""Times asgard against a synthetic repo and compares with a baseline.
+
+    python -m benchmarks.run --commits 100000 --output new.json
+    python -m benchmarks.run --commits 100000 --compare old.json
+
+Results are JSON: the environment the run happened in, the repo shape and,
+per benchmark, every repeat's wall time in seconds. Comparisons use the
+fastest repeat, which is the least noisy estimate of the real cost.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from asgard import app
+from asgard.git import GitRepo
+from asgard.lint import lint
+from asgard.semver import SemVer
+from benchmarks.generate import generate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def bench_main(repo_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        with contextlib.redirect_stderr(io.StringIO()):
+            app.main(["--repo-path", repo_path])
+
+
+def bench_log(repo_path):
+    GitRepo(repo_path).log()
+
+
+def bench_log_compact(repo_path):
+    GitRepo(repo_path).log(compact=True)
+
+
+def bench_classify(commits):
+    for commit in commits:
+        try:
+            app.classify(commit)
+        except ValueError:
+            pass
+
+
+def bench_lint(commits):
+    lint(commits)
+
+
+def bench_semver(tags):
+    SemVer.parse_many(tag.lstrip("v") for tag in tags)
+
+
+def bench_check_msg(msg_path):
+    """Runs the commit-msg hook the way git would: a fresh process per commit."""
+    subprocess.run(
+        [sys.executable, os.path.join(ROOT, "bin", "asgard"), "check-msg", msg_path],
+        env=dict(os.environ, PYTHONPATH=ROOT),
+        check=True,
+    )
+
+
+def timed(func, *args, repeat=3):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run(repo_path, repeat=3):
+    g = GitRepo(repo_path)
+    commits = g.log()
+    tags = [name for _, name in g.tags()]
+    g.close()
+    with tempfile.NamedTemporaryFile("w", suffix="_EDITMSG") as f:
+        f.write("feat(bench): check a message\n\n# Please enter the message\n")
+        f.flush()
+        # Process startup is noisy: take more samples.
+        check_msg = timed(bench_check_msg, f.name, repeat=repeat * 5)
+    return {
+        "env": {
+            "python": platform.python_version(),
+            "git": subprocess.run(
+                ["git", "--version"], stdout=subprocess.PIPE, universal_newlines=True
+            ).stdout.strip(),
+            "platform": platform.platform(),
+        },
+        "repo": {"commits": len(commits), "tags": len(tags)},
+        "results": {
+            "main": timed(bench_main, repo_path, repeat=repeat),
+            "log": timed(bench_log, repo_path, repeat=repeat),
+            "log_compact": timed(bench_log_compact, repo_path, repeat=repeat),
+            "classify": timed(bench_classify, commits, repeat=repeat),
+            "lint": timed(bench_lint, commits, repeat=repeat),
+            "semver": timed(bench_semver, tags, repeat=repeat),
+            "check_msg": check_msg,
+        },
+    }
+
+
+def compare(baseline, current, threshold):
+    """Returns a report line per benchmark and whether any regressed."""
+    lines, regressed = [], False
+    if baseline["repo"] != current["repo"]:
+        lines.append(
+            f"WARNING: repo shapes differ: {baseline['repo']} vs {current['repo']}"
+        )
+    for name, times in current["results"].items():
+        if name not in baseline["results"]:
+            lines.append(f"{name:<12} {min(times):9.4f}s (new)")
+            continue
+        old, new = min(baseline["results"][name]), min(times)
+        ratio = new / old if old else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag, regressed = "  REGRESSION", True
+        lines.append(f"{name:<12} {old:9.4f}s -> {new:9.4f}s  x{ratio:.2f}{flag}")
+    return lines, regressed
+
+
+def report(result):
+    for name, times in result["results"].items():
+        print(
+            f"{name:<12} min {min(times):9.4f}s  median {statistics.median(times):9.4f}s"
+        )
+
+
+def main(args=sys.argv[1:]):
+    a = parse_args(args)
+    with tempfile.TemporaryDirectory() as tmp:
+        repo_path = a.repo
+        if repo_path is None:
+            repo_path = os.path.join(tmp, "repo")
+            start = time.perf_counter()
+            generate(
+                repo_path,
+                a.commits,
+                tag_every=a.tag_every,
+                giant_every=a.giant_every,
+            )
+            print(
+                f"generated {a.commits} commits in {time.perf_counter() - start:.2f}s",
+                file=sys.stderr,
+            )
+        result = run(repo_path, a.repeat)
+
+    report(result)
+    if a.output:
+        with open(a.output, "w") as f:
+            json.dump(result, f, indent=2)
+    regressed = False
+    if a.compare:
+        with open(a.compare) as f:
+            lines, regressed = compare(json.load(f), result, a.threshold)
+        print("\n".join(lines))
+    check_msg = min(result["results"]["check_msg"])
+    if check_msg > a.check_msg_budget:
+        print(
+            f"check_msg    {check_msg:9.4f}s is over its {a.check_msg_budget}s budget"
+            "  REGRESSION"
+        )
+        regressed = True
+    if regressed:
+        sys.exit(1)
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument(
+        "--repo", help="benchmark an existing repo instead of generating one"
+    )
+    parser.add_argument("--commits", type=int, default=10_000)
+    parser.add_argument("--tag-every", type=int, default=50)
+    parser.add_argument("--giant-every", type=int, default=5_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="slowdown ratio counted as a regression (default: 1.2)",
+    )
+    parser.add_argument(
+        "--check-msg-budget",
+        type=float,
+        default=0.02,
+        help="seconds the commit-msg hook may take to start and answer "
+        "(default: 0.02)",
+    )
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,7 @@ setuptools.setup(
     long_description_type="text/markdown",
     author="Claude Léveillé",
     url="https://github.com/claudeleveille/asgard",
-    packages=setuptools.find_packages(),
+    packages=setuptools.find_packages(exclude=["benchmarks"]),
     scripts=["bin/asgard"],
     classifiers=[
         "Development Status :: 3 - Alpha",
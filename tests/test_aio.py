@@ -0,0 +1,127 @@
+import asyncio
+
+import pytest
+
+from asgard import aio
+from asgard.aio import AsyncGitRepo, bump_level_async, infer_vnext_async
+from asgard.app import bump_level, infer_vnext
+from asgard.git import GitRepo
+
+
+def make_repos(count):
+    repos = [GitRepo() for _ in range(count)]
+    for i, g in enumerate(repos):
+        g.commit("feat: initial commit", allow_empty=True)
+        g.tag("v1.0.0")
+        g.commit(["fix: a", "feat: b", "feat!: c"][i % 3], allow_empty=True)
+    return repos
+
+
+def test_async_log_and_tags_match_sync():
+    with GitRepo() as g:
+        g.commit("feat: a\n\nbody", allow_empty=True)
+        g.tag("v0.1.0")
+        g.commit("fix: b", allow_empty=True)
+        g.git("tag -a v0.1.1 -m 'annotated'")
+
+        async def read():
+            repo = AsyncGitRepo(g.repo_path)
+            repo.chunk_size = 7
+            log = [commit async for commit in repo.iter_log()]
+            return log, await repo.tags(), await repo.latest_tag()
+
+        log, tags, latest = asyncio.run(read())
+        assert log == list(reversed(g.log()))
+        assert tags == g.tags()
+        assert latest == g.latest_tag()
+
+
+@pytest.mark.parametrize(
+    "messages",
+    [["fix: a", "WIP", "feat: b"], ["feat!: a", "WIP"], ["WIP"], []],
+)
+def test_bump_level_async_matches_sync(messages, capsys):
+    commits = [
+        {"hash": f"{i:040x}", "message": message} for i, message in enumerate(messages)
+    ]
+
+    async def read():
+        for commit in commits:
+            yield commit
+
+    expected = bump_level(commits)
+    expected_err = capsys.readouterr().err
+    assert asyncio.run(bump_level_async(read())) == expected
+    assert capsys.readouterr().err == expected_err
+
+
+def test_many_concurrent_inferences_share_a_semaphore(monkeypatch):
+    repos = make_repos(9)
+    running, peak = 0, 0
+    spawn, stop = AsyncGitRepo._spawn, AsyncGitRepo._stop
+
+    async def counting_spawn(self, args):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        return await spawn(self, args)
+
+    async def counting_stop(proc):
+        nonlocal running
+        running -= 1
+        await stop(proc)
+
+    monkeypatch.setattr(AsyncGitRepo, "_spawn", counting_spawn)
+    monkeypatch.setattr(AsyncGitRepo, "_stop", staticmethod(counting_stop))
+    monkeypatch.setattr(aio, "MAX_GIT_PROCESSES", 2)
+
+    async def infer_all():
+        return await asyncio.gather(*(infer_vnext_async(g.repo_path) for g in repos))
+
+    try:
+        vnexts = asyncio.run(infer_all())
+        assert [str(v) for v in vnexts] == [str(infer_vnext(g.log())) for g in repos]
+        assert [str(v) for v in vnexts[:3]] == ["1.0.1", "1.1.0", "2.0.0"]
+        assert peak <= 2
+    finally:
+        for g in repos:
+            g.__exit__()
+
+
+def test_cancelling_kills_git():
+    with GitRepo() as g:
+        g.commit("feat: a", allow_empty=True)
+        procs = []
+
+        async def read_forever():
+            repo = AsyncGitRepo(g.repo_path)
+
+            async def spawn_sleep(args):
+                proc = await asyncio.create_subprocess_exec(
+                    "sleep", "60", stdout=asyncio.subprocess.PIPE
+                )
+                procs.append(proc)
+                return proc
+
+            repo._spawn = spawn_sleep
+            async for _ in repo.iter_log(index=()):
+                pass
+
+        async def cancel():
+            task = asyncio.ensure_future(read_forever())
+            while not procs:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel())
+        assert procs[0].returncode is not None
+
+
+def test_infer_vnext_async_errors(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        AsyncGitRepo(str(tmp_path / "missing"))
+    with GitRepo() as g:
+        with pytest.raises(ValueError):
+            asyncio.run(infer_vnext_async(g.repo_path))
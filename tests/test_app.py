@@ -1,8 +1,22 @@
+import json
+import os
+import pstats
+
 import pytest
 
+from asgard import app
+from asgard.cache import ClassificationCache
 from asgard.git import GitRepo
 from asgard.semver import SemVer
-from asgard.app import main, parse_args, infer_vnext, get_latest_tag_index
+from asgard.app import (
+    main,
+    parse_args,
+    infer_vnext,
+    get_latest_tag_index,
+    split_package_logs,
+    bump_level,
+    next_version,
+)
 
 
 @pytest.mark.parametrize(
@@ -192,3 +206,285 @@ def test_version_inference_with_non_cc_commit_msg():
         g.tag("v0.1.0")
         g.commit("test2", allow_empty=True)
         assert infer_vnext(g.log()) == "0.1.1"
+
+
+def test_main_with_cache_reuses_classifications(capsys):
+    with GitRepo() as g:
+        g.commit("feat: initial commit", allow_empty=True)
+        g.tag("0.1.0")
+        g.commit("feat: test", allow_empty=True)
+        main(["--repo-path", g.repo_path, "--cache"])
+        cache = ClassificationCache(os.path.join(g.git_dir(), "asgard", "cache"))
+        assert cache.get(g.log()[1]["hash"]) == "feat"
+        cache.put(g.log()[1]["hash"], "BREAKING CHANGE")
+        cache.flush()
+        main(["--repo-path", g.repo_path, "--cache"])
+    c = capsys.readouterr()
+    assert c.out == "0.2.0\n1.0.0\n"
+
+
+def test_main_read_only_reads_but_never_writes_the_cache(capsys):
+    with GitRepo() as g:
+        g.commit("feat: initial commit", allow_empty=True)
+        g.tag("0.1.0")
+        g.commit("feat: test", allow_empty=True)
+        path = os.path.join(g.git_dir(), "asgard", "cache")
+        for args in (["--read-only", "--cache"], ["timeline", "--cache"]):
+            main(args[:1] + ["--repo-path", g.repo_path] + args[1:])
+            assert not os.path.exists(path)
+        cache = ClassificationCache(path)
+        cache.put(g.log()[1]["hash"], "BREAKING CHANGE")
+        cache.flush()
+        main(["--repo-path", g.repo_path, "--read-only", "--cache"])
+    lines = capsys.readouterr().out.splitlines()
+    assert (lines[0], lines[-1]) == ("0.2.0", "1.0.0")
+
+
+def test_main_with_native_backend(capsys):
+    with GitRepo() as g:
+        g.commit("feat: initial commit", allow_empty=True)
+        g.tag("v0.1.0")
+        g.commit("feat: test", allow_empty=True)
+        main(["--repo-path", g.repo_path, "--backend", "native", "--tag"])
+        assert g.log()[1]["tag"] == "v0.2.0"
+    c = capsys.readouterr()
+    assert c.out == "0.2.0\n"
+
+
+def commit_file(g, path, message):
+    os.makedirs(os.path.dirname(os.path.join(g.repo_path, path)), exist_ok=True)
+    with open(os.path.join(g.repo_path, path), "a") as f:
+        f.write(message + "\n")
+    g.add()
+    g.commit(message)
+
+
+def test_split_package_logs_assigns_commits_by_path_and_tag():
+    log = (
+        {"hash": "1", "message": "feat: a", "paths": ["pkgs/a/x", "pkgs/b/y"]},
+        {"hash": "2", "message": "fix: b", "paths": ["pkgs/b/y", "README.md"]},
+        {"hash": "3", "message": "release: a", "paths": []},
+    )
+    logs = split_package_logs(
+        log,
+        [("a", "pkgs/a"), ("b", "pkgs/b"), ("all", ".")],
+        [("3", "a/v0.1.0"), ("3", "v9.0.0")],
+    )
+    assert [c["hash"] for c in logs["a"]] == ["1", "3"]
+    assert logs["a"][-1]["tag"] == "v0.1.0"
+    assert [c["hash"] for c in logs["b"]] == ["1", "2"]
+    assert [c["hash"] for c in logs["all"]] == ["1", "2", "3"]
+    assert "tag" not in logs["all"][-1]
+
+
+@pytest.mark.parametrize("backend", ["git", "native"])
+def test_main_with_packages(backend, capsys):
+    with GitRepo() as g:
+        commit_file(g, "a/x", "feat: a")
+        commit_file(g, "b/y", "fix: b")
+        args = ["--repo-path", g.repo_path, "--backend", backend]
+        args += ["--package", "a=a", "--package", "b=b/", "--package", "c=c"]
+        main(args + ["--commit", "--tag"])
+        assert g.log()[-1]["message"] == "release: a 0.1.0, b 0.1.0"
+        assert g.tag_index(prefix="a/").tag(g.log()[-1]["hash"]) == "v0.1.0"
+        commit_file(g, "a/x", "feat: a2")
+        commit_file(g, "a/x", "fix: a3")
+        main(args)
+        commit_file(g, "b/y", "feat: b2\n\nBREAKING CHANGE: b")
+        main(args)
+    c = capsys.readouterr()
+    assert c.out == "a 0.1.0\nb 0.1.0\na 0.2.0\na 0.2.0\nb 1.0.0\n"
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["--changelog", "CHANGELOG.md"],
+        ["--notes"],
+        ["--notes-remote", "origin"],
+        ["--traversal", "first-parent"],
+        ["--tag-selection", "version"],
+    ],
+)
+def test_package_mode_rejects_unsupported_options(args, capsys):
+    with pytest.raises(SystemExit) as e:
+        parse_args(["--package", "a=a"] + args)
+    assert e.value.code == 2
+    assert f"{args[0]} isn't supported with --package" in capsys.readouterr().err
+
+
+def test_bump_level_stops_reading_at_first_breaking_change():
+    consumed = []
+
+    def commits():
+        for i, message in enumerate(["fix: a", "feat!: b", "feat: c", "fix: d"]):
+            consumed.append(i)
+            yield {"hash": str(i), "message": message}
+
+    assert bump_level(commits()) == "major"
+    assert consumed == [0, 1]
+
+
+def test_next_version_does_not_read_commits_for_matching_prerelease():
+    def commits():
+        raise AssertionError("commits should not be read")
+        yield
+
+    assert next_version("v1.0.0rc1", commits(), suffix="rc") == "1.0.0rc2"
+
+
+@pytest.mark.parametrize("backend", ["git", "native"])
+def test_main_with_version_tag_selection(backend, capsys):
+    with GitRepo() as g:
+        g.commit("feat: a", allow_empty=True)
+        g.tag("v2.0.0")
+        g.commit("fix: maintenance", allow_empty=True)
+        g.tag("v1.4.2")
+        g.git("checkout -q -b unmerged")
+        g.commit("feat: unmerged", allow_empty=True)
+        g.tag("v3.0.0")
+        g.git("checkout -q -")
+        g.commit("feat: b", allow_empty=True)
+        args = ["--repo-path", g.repo_path, "--backend", backend]
+        main(args)
+        main(args + ["--tag-selection", "version"])
+    c = capsys.readouterr()
+    assert c.out == "1.5.0\n2.1.0\n"
+
+
+def test_main_with_stats(tmp_path, capsys):
+    with GitRepo() as g:
+        g.commit("feat: initial commit", allow_empty=True)
+        g.tag("v0.1.0")
+        g.commit("fix: test", allow_empty=True)
+        g.commit("feat: test", allow_empty=True)
+        main(["--repo-path", g.repo_path, "--stats", "--tag"])
+        main(["--repo-path", g.repo_path, "--stats", str(tmp_path / "stats.json")])
+    c = capsys.readouterr()
+    assert c.out == "0.2.0\n0.2.1\n"
+    report = json.loads(c.err)
+    assert {"open", "tags", "history", "classify", "version", "write"} <= set(
+        report["phases"]
+    )
+    assert report["counters"]["commits_examined"] == 2
+    assert report["counters"]["git_processes"] > 0
+    assert report["counters"]["git_bytes_read"] > 0
+    with open(tmp_path / "stats.json") as f:
+        assert json.load(f)["counters"]["commits_examined"] == 0
+
+
+def test_main_with_profile(tmp_path, capsys):
+    with GitRepo() as g:
+        g.commit("feat: initial commit", allow_empty=True)
+        main(["--repo-path", g.repo_path, "--profile", str(tmp_path / "prof")])
+    assert pstats.Stats(str(tmp_path / "prof")).total_calls > 0
+
+
+def shallow_clone(origin, depth, path):
+    origin.git(f"clone -q --depth={depth} file://{origin.repo_path} {path}")
+    return GitRepo(str(path))
+
+
+@pytest.mark.parametrize("backend", ["git", "native"])
+def test_main_deepens_shallow_clones_geometrically(
+    backend, capsys, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(app, "DEEPEN_STEP", 1)
+    with GitRepo() as origin:
+        origin.commit("feat: initial commit", allow_empty=True)
+        origin.commit("feat: tagged", allow_empty=True)
+        origin.tag("v0.1.0")
+        for i in range(7):
+            origin.commit(f"fix: {i}", allow_empty=True)
+        with shallow_clone(origin, 2, tmp_path / "clone") as clone:
+            args = ["--repo-path", clone.repo_path, "--backend", backend]
+            main(args + ["--no-deepen"])
+            assert clone.is_shallow()
+            main(args)
+            assert clone.is_shallow()
+            # 2 + 1 + 2 + 4 commits: the tag is the 8th one.
+            assert clone.git("rev-list --count HEAD").stdout == b"9\n"
+    c = capsys.readouterr()
+    assert c.out == "0.1.0\n0.1.1\n"
+
+
+def test_main_deepens_until_the_clone_is_complete(capsys, tmp_path):
+    with GitRepo() as origin:
+        origin.commit("feat: initial commit", allow_empty=True)
+        origin.commit("fix: a", allow_empty=True)
+        with shallow_clone(origin, 1, tmp_path / "clone") as clone:
+            main(["--repo-path", clone.repo_path])
+            assert not clone.is_shallow()
+    assert capsys.readouterr().out == "0.1.0\n"
+
+
+def test_main_carries_on_when_deepening_fails(capsys, tmp_path):
+    with GitRepo() as origin:
+        origin.commit("feat: initial commit", allow_empty=True)
+        origin.tag("v1.0.0")
+        origin.commit("fix: a", allow_empty=True)
+        with shallow_clone(origin, 1, tmp_path / "clone") as clone:
+            clone.git(f"remote set-url origin file://{tmp_path / 'gone'}")
+            main(["--repo-path", clone.repo_path])
+            assert clone.is_shallow()
+    c = capsys.readouterr()
+    assert c.out == "0.1.0\n"
+    assert "WARNING: Couldn't deepen shallow clone" in c.err
+
+
+def merge_history(g, merge_message=None):
+    g.commit("feat: initial commit", allow_empty=True)
+    g.tag("v0.1.0")
+    g.git("checkout -q -b topic")
+    g.commit("feat!: breaking on a branch", allow_empty=True)
+    g.commit("fix: on a branch", allow_empty=True)
+    g.git("checkout -q -")
+    g.commit("fix: on the release line", allow_empty=True)
+    message = f"-m '{merge_message}'" if merge_message else "--no-edit"
+    g.git(f"merge -q --no-ff {message} topic")
+
+
+@pytest.mark.parametrize("backend", ["git", "native"])
+@pytest.mark.parametrize(
+    "merge_message,traversal,vnext",
+    [
+        (None, "all", "1.0.0"),
+        (None, "first-parent", "0.1.1"),
+        (None, "merges", "1.0.0"),
+        ("feat: merge topic (#2)", "first-parent", "0.2.0"),
+        ("feat: merge topic (#2)", "merges", "0.2.0"),
+    ],
+)
+def test_main_traversals(backend, merge_message, traversal, vnext, capsys):
+    with GitRepo() as g:
+        merge_history(g, merge_message)
+        main(
+            ["--repo-path", g.repo_path, "--backend", backend]
+            + ["--traversal", traversal]
+        )
+    assert capsys.readouterr().out == f"{vnext}\n"
+
+
+def test_first_parent_traversal_ignores_tags_on_merged_branches(capsys):
+    with GitRepo() as g:
+        merge_history(g)
+        g.git("tag v5.0.0 topic")
+        g.commit("fix: after", allow_empty=True)
+        main(["--repo-path", g.repo_path])
+        main(["--repo-path", g.repo_path, "--traversal", "first-parent"])
+    assert capsys.readouterr().out == "5.0.1\n0.1.1\n"
+
+
+@pytest.mark.parametrize("backend", ["git", "native"])
+def test_main_read_only_on_bare_mirror(backend, capsys, tmp_path):
+    with GitRepo() as g:
+        g.commit("feat: initial commit", allow_empty=True)
+        g.tag("v0.1.0")
+        g.commit("feat: test", allow_empty=True)
+        mirror = str(tmp_path / "mirror.git")
+        g.git(f"clone -q --mirror . {mirror}")
+    args = ["--repo-path", mirror, "--backend", backend, "--read-only"]
+    main(args)
+    assert capsys.readouterr().out == "0.2.0\n"
+    with pytest.raises(PermissionError):
+        main(args + ["--tag"])
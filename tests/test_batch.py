@@ -0,0 +1,80 @@
+import json
+import os
+from tempfile import TemporaryDirectory
+
+import pytest
+
+from asgard import batch
+from asgard.app import main, open_repo
+from asgard.batch import release_repo
+from asgard.git import GitRepo
+
+
+def test_batch_reports_each_repo_and_isolates_failures(capsys):
+    with GitRepo() as a, GitRepo() as b, GitRepo() as empty:
+        a.commit("feat: a", allow_empty=True)
+        a.tag("v1.0.0")
+        a.commit("feat: a2", allow_empty=True)
+        b.commit("fix: b", allow_empty=True)
+        missing = os.path.join(a.repo_path, "missing")
+        with pytest.raises(SystemExit) as e:
+            main(
+                [
+                    "batch",
+                    "--jobs",
+                    "2",
+                    a.repo_path,
+                    b.repo_path,
+                    empty.repo_path,
+                    missing,
+                ]
+            )
+        assert e.value.code == 1
+        results = {}
+        for line in capsys.readouterr().out.splitlines():
+            result = json.loads(line)
+            results[result.pop("repo")] = result
+        assert results[a.repo_path] == {"vnext": "1.1.0"}
+        assert results[b.repo_path] == {"vnext": "0.1.0"}
+        assert results[empty.repo_path]["error"].startswith("ValueError")
+        assert results[missing]["error"].startswith("FileNotFoundError")
+
+
+def test_batch_manifest_with_tags(capsys):
+    with GitRepo() as a, GitRepo() as b, TemporaryDirectory() as t:
+        a.commit("feat: a", allow_empty=True)
+        b.commit("feat: b", allow_empty=True)
+        manifest = os.path.join(t, "manifest")
+        with open(manifest, "w") as f:
+            f.write(f"# repos\n{a.repo_path}\n\n{b.repo_path}\n")
+        main(["batch", "--manifest", manifest, "--tag"])
+        assert len(capsys.readouterr().out.splitlines()) == 2
+        assert a.log()[0]["tag"] == b.log()[0]["tag"] == "v0.1.0"
+
+
+@pytest.mark.parametrize("backend", ["git", "native"])
+def test_release_repo_closes_the_repo(backend, monkeypatch):
+    opened = []
+
+    def recording_open_repo(*args, **kwargs):
+        opened.append(open_repo(*args, **kwargs))
+        return opened[-1]
+
+    monkeypatch.setattr(batch, "open_repo", recording_open_repo)
+    with GitRepo() as g:
+        g.commit("feat: a", allow_empty=True)
+        g.tag("v1.0.0")
+        g.commit("fix: b", allow_empty=True)
+        a = batch.parse_args(["--notes", "--traversal", "merges", "--backend", backend])
+        for _ in range(2):
+            assert release_repo(g.repo_path, a) == {
+                "repo": g.repo_path,
+                "vnext": "1.0.1",
+            }
+        assert os.path.isdir(g.repo_path)
+    assert len(opened) == 2
+    for repo in opened:
+        if backend == "git":
+            assert repo._cat_file.proc is None and repo._cat_file_check.proc is None
+        else:
+            assert repo.native.odb.packs is None
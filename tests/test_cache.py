@@ -0,0 +1,69 @@
+import os
+from tempfile import TemporaryDirectory
+
+from asgard.cache import ClassificationCache
+
+
+def test_entries_survive_a_reload():
+    with TemporaryDirectory() as t:
+        path = os.path.join(t, "asgard", "cache")
+        c = ClassificationCache(path)
+        c.put("a" * 40, "feat")
+        c.put("b" * 40, c.invalid)
+        c.flush()
+        c = ClassificationCache(path)
+        assert c.get("a" * 40) == "feat"
+        assert c.get("b" * 40) == c.invalid
+        assert c.get("c" * 40) is None
+
+
+def test_flush_appends_only_new_entries():
+    with TemporaryDirectory() as t:
+        path = os.path.join(t, "cache")
+        c = ClassificationCache(path)
+        c.put("a" * 40, "feat")
+        c.flush()
+        c = ClassificationCache(path)
+        c.put("a" * 40, "feat")
+        c.put("b" * 40, "fix")
+        c.flush()
+        with open(path) as f:
+            assert f.read() == f"{c.header}{'a' * 40} feat\n{'b' * 40} fix\n"
+
+
+def test_truncated_trailing_entry_is_ignored():
+    with TemporaryDirectory() as t:
+        path = os.path.join(t, "cache")
+        with open(path, "w") as f:
+            f.write(f"{ClassificationCache.header}{'a' * 40} feat\n{'b' * 40} fi")
+        c = ClassificationCache(path)
+        assert c.get("a" * 40) == "feat" and c.get("b" * 40) is None
+
+
+def test_flush_after_truncated_entry_rewrites_the_file():
+    with TemporaryDirectory() as t:
+        path = os.path.join(t, "cache")
+        with open(path, "w") as f:
+            f.write(f"{ClassificationCache.header}{'a' * 40} feat\n{'b' * 40} fi")
+        c = ClassificationCache(path)
+        c.put("c" * 40, "feat")
+        c.flush()
+        c = ClassificationCache(path)
+        assert c.get("a" * 40) == "feat"
+        assert c.get("b" * 40) is None
+        assert c.get("c" * 40) == "feat"
+        with open(path) as f:
+            assert f.read() == f"{c.header}{'a' * 40} feat\n{'c' * 40} feat\n"
+
+
+def test_unknown_format_is_discarded_and_rewritten():
+    with TemporaryDirectory() as t:
+        path = os.path.join(t, "cache")
+        with open(path, "w") as f:
+            f.write(f"asgard-cache 0\n{'a' * 40} feat\n")
+        c = ClassificationCache(path)
+        assert c.get("a" * 40) is None
+        c.put("b" * 40, "fix")
+        c.flush()
+        with open(path) as f:
+            assert f.read() == f"{c.header}{'b' * 40} fix\n"
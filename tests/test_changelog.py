@@ -0,0 +1,69 @@
+import os
+
+from asgard.app import main
+from asgard.changelog import Changelog
+from asgard.git import GitRepo
+
+
+def commits(*messages):
+    return [{"hash": f"{i:040x}", "message": m} for i, m in enumerate(messages)]
+
+
+def test_sections_are_grouped_and_ordered(tmp_path):
+    notes = Changelog()
+    for commit in commits(
+        "docs: explain",
+        "fix(parser): handle tabs",
+        "WIP",
+        "feat!: drop python 2",
+        "feat: add thing",
+    ):
+        notes.add(commit)
+    path = tmp_path / "CHANGELOG.md"
+    notes.prepend_to(str(path), "v1.0.0", date="2020-01-02")
+    notes.close()
+    assert path.read_text() == (
+        "# Changelog\n\n"
+        "## v1.0.0 (2020-01-02)\n\n"
+        "### Breaking changes\n\n- drop python 2 (0000000)\n\n"
+        "### Features\n\n- add thing (0000000)\n\n"
+        "### Bug fixes\n\n- **parser:** handle tabs (0000000)\n\n"
+        "### docs\n\n- explain (0000000)\n\n"
+        "### Other changes\n\n- WIP (0000000)\n\n"
+    )
+
+
+def test_prepend_keeps_title_and_old_sections_verbatim(tmp_path):
+    path = tmp_path / "CHANGELOG.md"
+    old = "## v0.1.0\n\nHand-edited *notes*  \n"
+    path.write_text("# My project\n\n" + old)
+    notes = Changelog()
+    notes.spool_size = 10
+    for commit in commits(*(f"fix: bug {i}" for i in range(50))):
+        notes.add(commit)
+    notes.prepend_to(str(path), "v0.1.1", date="2020-01-02")
+    text = path.read_text()
+    assert text.startswith("# My project\n\n## v0.1.1 (2020-01-02)\n\n### Bug fixes")
+    assert text.count("- bug") == 50
+    assert text.endswith("\n\n" + old)
+    assert os.listdir(tmp_path) == ["CHANGELOG.md"]
+
+
+def test_main_with_changelog_covers_the_whole_range(capsys):
+    with GitRepo() as g:
+        g.commit("feat: initial commit", allow_empty=True)
+        g.tag("v0.1.0")
+        g.commit("fix: early", allow_empty=True)
+        g.commit("feat!: breaking", allow_empty=True)
+        g.commit("feat: late", allow_empty=True)
+        path = os.path.join(g.repo_path, "CHANGELOG.md")
+        main(["--repo-path", g.repo_path, "--changelog", path, "--commit"])
+        with open(path) as f:
+            text = f.read()
+        assert g.log()[-1]["message"] == "release: 1.0.0"
+        assert g.git("status --porcelain").stdout == b""
+    assert capsys.readouterr().out == "1.0.0\n"
+    assert "## v1.0.0" in text
+    for entry in ("- early", "- breaking", "- late"):
+        assert entry in text
+    assert "initial commit" not in text
@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from asgard.app import main
+from asgard.checkmsg import clean_message
+
+BIN = os.path.join(os.path.dirname(__file__), "..", "bin", "asgard")
+
+
+def check_msg(tmp_path, text):
+    path = tmp_path / "COMMIT_EDITMSG"
+    path.write_text(text)
+    return main(["check-msg", str(path)])
+
+
+def test_clean_message_strips_comments_and_verbose_diff():
+    text = (
+        "\n\nfeat: add thing  \n\nBody.\n# Please enter the commit message\n"
+        "# ------------------------ >8 ------------------------\n"
+        "diff --git a/x b/x\n"
+    )
+    assert clean_message(text) == "feat: add thing\n\nBody."
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "feat: add thing\n# comment\n",
+        "fix(parser)!: drop support\n\nBREAKING CHANGE: gone\n",
+        "Merge branch 'topic'\n",
+        "fixup! feat: add thing\n",
+    ],
+)
+def test_check_msg_accepts(tmp_path, text):
+    assert check_msg(tmp_path, text) is None
+
+
+@pytest.mark.parametrize(
+    "text,rule",
+    [
+        ("FEAT: add thing\n", "type-case"),
+        ("feat add thing\n", "type-colon"),
+        ("feat:add thing\n", "colon-space"),
+        ("feat(): add thing\n", "scope"),
+        ("# only a comment\nfix\n", "too-short"),
+    ],
+)
+def test_check_msg_rejects_with_rule(tmp_path, capsys, text, rule):
+    with pytest.raises(SystemExit) as e:
+        check_msg(tmp_path, text)
+    assert e.value.code == 1
+    err = capsys.readouterr().err
+    assert f"({rule})" in err
+    assert clean_message(text).split("\n")[0] in err
+
+
+def test_check_msg_missing_file(tmp_path):
+    with pytest.raises(SystemExit) as e:
+        main(["check-msg", str(tmp_path / "missing")])
+    assert e.value.code == 2
+
+
+def test_check_msg_hook_imports_only_the_parser(tmp_path):
+    path = tmp_path / "COMMIT_EDITMSG"
+    path.write_text("feat: add thing\n")
+    env = dict(os.environ, PYTHONPATH=os.path.join(os.path.dirname(BIN), ".."))
+    res = subprocess.run(
+        [sys.executable, "-X", "importtime", BIN, "check-msg", str(path)],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        env=env,
+    )
+    assert res.returncode == 0
+    imported = {line.split("|")[-1].strip() for line in res.stderr.splitlines()}
+    assert "asgard.conventionalcommits" in imported
+    for module in ("argparse", "subprocess", "asgard.app", "asgard.git"):
+        assert module not in imported
@@ -1,6 +1,8 @@
+import time
+
 import pytest
 
-from asgard.conventionalcommits import ConventionalCommitMsg
+from asgard.conventionalcommits import CommitMsgError, ConventionalCommitMsg
 
 
 def test_repr_is_the_full_commit_message():
@@ -50,3 +52,75 @@ def test_type_parsing(msg, msg_type):
 def test_equality():
     msg = "feat: test"
     assert ConventionalCommitMsg(msg) == ConventionalCommitMsg(msg) == msg
+
+
+@pytest.mark.parametrize(
+    "msg,rule",
+    [
+        ("", "too-short"),
+        ("8: a", "type-start"),
+        ("FEAT: a", "type-case"),
+        ("feat(: a", "scope"),
+        ("feat(): a", "scope"),
+        ("feat a", "type-colon"),
+        ("feat:a", "colon-space"),
+        ("feat:  ", "description"),
+    ],
+)
+def test_errors_name_the_failing_rule(msg, rule):
+    with pytest.raises(CommitMsgError) as e:
+        ConventionalCommitMsg(msg)
+    assert e.value.rule == rule and str(e.value)
+
+
+def test_parses_every_part():
+    c = ConventionalCommitMsg(
+        "feat(api)!: add thing\n\nfirst paragraph\n\nsecond paragraph\n\n"
+        "Reviewed-by: Z\nBREAKING-CHANGE: old thing\n  is gone\nRefs #133"
+    )
+    assert c.type == "feat" and c.scope == "api" and c.breaking
+    assert c.description == "add thing"
+    assert c.body == "first paragraph\n\nsecond paragraph"
+    assert c.footers == [
+        ("Reviewed-by", "Z"),
+        ("BREAKING-CHANGE", "old thing\n  is gone"),
+        ("Refs", "133"),
+    ]
+    assert c.msg_type == "BREAKING CHANGE"
+
+
+@pytest.mark.parametrize(
+    "msg,msg_type",
+    [
+        ("feat(api): a", "feat"),
+        ("fix!: a", "BREAKING CHANGE"),
+        ("fix(api)!: a", "BREAKING CHANGE"),
+        ("feat: a\n\nBREAKING-CHANGE: b", "BREAKING CHANGE"),
+        ("feat: a\n\nmentions BREAKING CHANGE: in passing", "feat"),
+    ],
+)
+def test_scope_and_breaking_markers(msg, msg_type):
+    assert ConventionalCommitMsg(msg).msg_type == msg_type
+
+
+@pytest.mark.parametrize(
+    "msg",
+    [
+        "a" * 4_000_000,
+        "feat(" + "a" * 4_000_000,
+        ":" * 4_000_000,
+        "feat: a\n" + "a" * 4_000_000,
+        "feat: a\n\n" + "Token: a\n" * 400_000,
+        "feat: a\n\nToken: a\n" + " continued\n" * 400_000,
+        "feat: a\n" + "\n" * 4_000_000,
+        "feat: a\n" + "BREAKING CHANGE" * 250_000,
+    ],
+    ids=range(8),
+)
+def test_parsing_time_is_linear_on_adversarial_messages(msg):
+    start = time.perf_counter()
+    try:
+        ConventionalCommitMsg(msg)
+    except CommitMsgError:
+        pass
+    assert time.perf_counter() - start < 5
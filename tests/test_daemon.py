@@ -0,0 +1,163 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from asgard.app import main
+from asgard.client import decode, encode, parse_args
+from asgard.daemon import Server
+from asgard.git import GitRepo
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+BIN = os.path.join(ROOT, "bin", "asgard")
+
+
+@pytest.fixture
+def server(tmp_path):
+    socket_path = str(tmp_path / "asgard.sock")
+    with Server(socket_path) as server:
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        try:
+            yield server
+        finally:
+            server.shutdown()
+            thread.join()
+    assert not os.path.exists(socket_path)
+
+
+def query(server, capsys, *args):
+    main(["query", "--socket", server.server_address] + list(args))
+    return capsys.readouterr().out
+
+
+def test_query_answers_and_refreshes_when_refs_change(server, capsys, monkeypatch):
+    with GitRepo() as g:
+        g.commit("feat: a", allow_empty=True)
+        g.tag("v1.0.0")
+        g.commit("fix: b", allow_empty=True)
+        assert query(server, capsys, "--repo-path", g.repo_path) == "1.0.1\n"
+
+        calls = []
+        warm = server.repos[(g.repo_path, "git", False)]
+        monkeypatch.setattr(warm.g, "iter_log", lambda *a, **kw: calls.append(1))
+        assert query(server, capsys, "--repo-path", g.repo_path) == "1.0.1\n"
+        assert calls == []
+        monkeypatch.undo()
+
+        g.commit("feat: c", allow_empty=True)
+        assert query(server, capsys, "--repo-path", g.repo_path) == "1.1.0\n"
+        assert query(server, capsys, "--repo-path", g.repo_path, "--tag") == "1.1.0\n"
+        assert g.log()[-1]["tag"] == "v1.1.0"
+        g.commit("fix: d", allow_empty=True)
+        assert query(server, capsys, "--repo-path", g.repo_path) == "1.1.1\n"
+
+
+def test_query_reports_errors(server, capsys):
+    with pytest.raises(SystemExit) as e:
+        main(["query", "--socket", server.server_address, "--repo-path", "/missing"])
+    assert e.value.args[0].startswith("FileNotFoundError")
+    with pytest.raises(SystemExit) as e:
+        main(["query", "--socket", server.server_address, "--bogus"])
+    assert "--bogus" in e.value.args[0]
+
+
+def test_query_without_daemon(tmp_path):
+    with pytest.raises(SystemExit) as e:
+        main(["query", "--socket", str(tmp_path / "none.sock")])
+    assert "can't reach daemon" in e.value.args[0]
+
+
+def test_server_replaces_stale_socket_but_not_live_one(server, tmp_path):
+    with pytest.raises(RuntimeError):
+        Server(server.server_address)
+    stale = str(tmp_path / "stale.sock")
+    Server(stale).socket.close()
+    with Server(stale):
+        pass
+
+
+@pytest.mark.parametrize("backend", ["git", "native"])
+def test_query_rereads_refs_and_packs_after_gc(server, capsys, backend):
+    with GitRepo() as g:
+        g.commit("feat: a", allow_empty=True)
+        g.tag("v1.0.0")
+        args = ["--repo-path", g.repo_path, "--backend", backend]
+        assert query(server, capsys, *args) == "1.0.1\n"
+        g.commit("feat: b", allow_empty=True)
+        g.git("gc -q")
+        assert not os.path.exists(os.path.join(g.git_dir(), "refs", "heads", "master"))
+        assert query(server, capsys, *args) == "1.1.0\n"
+        g.commit("feat!: c", allow_empty=True)
+        g.git("repack -q -a -d")
+        assert query(server, capsys, *args) == "2.0.0\n"
+
+
+def test_query_honors_read_only_and_cache(server, capsys, tmp_path):
+    with GitRepo() as origin:
+        origin.commit("feat: a", allow_empty=True)
+        origin.tag("v1.0.0")
+        for i in range(3):
+            origin.commit(f"fix: {i}", allow_empty=True)
+        clone = str(tmp_path / "clone")
+        origin.git(f"clone -q --depth=1 file://{origin.repo_path} {clone}")
+        args = ["--repo-path", clone, "--read-only", "--notes"]
+        assert query(server, capsys, *args) == "0.1.0\n"
+        g = GitRepo(clone, read_only=True)
+        assert g.is_shallow()
+        assert g.git("notes --ref=refs/notes/asgard list").stdout == b""
+        cache = os.path.join(g.git_dir(), "asgard", "cache")
+        assert not os.path.exists(cache)
+        assert query(server, capsys, "--repo-path", clone, "--cache") == "1.0.1\n"
+        assert os.path.exists(cache)
+        g.close()
+
+
+@pytest.mark.parametrize(
+    "request_",
+    [
+        {"repo": "/repo", "args": []},
+        {"repo": 'we"ird\\path\n\t\x01é', "args": ["--prerelease-suffix", "rc"]},
+        {"repo": "/bad\udcff", "args": ["--tag"]},
+    ],
+)
+def test_client_encodes_requests_as_json(request_):
+    assert json.loads(encode(request_)) == request_
+
+
+@pytest.mark.parametrize(
+    "response", [{"vnext": "1.2.3rc4"}, {"error": 'ValueError: "x"\nno'}]
+)
+def test_client_decodes_responses(response):
+    assert decode(json.dumps(response).encode() + b"\n") == response
+
+
+def test_client_parses_its_options_and_forwards_the_rest(capsys):
+    a, forwarded = parse_args(
+        ["--tag", "--socket=/s.sock", "--repo-path", "/r", "--prerelease-suffix=rc"]
+    )
+    assert (a.socket, a.repo_path) == ("/s.sock", "/r")
+    assert forwarded == ["--tag", "--prerelease-suffix=rc"]
+    with pytest.raises(SystemExit) as e:
+        parse_args(["--socket"])
+    assert "--socket needs a value" in e.value.code
+    with pytest.raises(SystemExit) as e:
+        parse_args(["--help"])
+    assert e.value.code == 0
+    assert capsys.readouterr().out.startswith("usage: asgard query")
+
+
+def test_client_stays_thin():
+    res = subprocess.run(
+        [sys.executable, "-X", "importtime", BIN, "query", "--socket", "/nonexistent"],
+        env=dict(os.environ, PYTHONPATH=ROOT),
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    assert "can't reach daemon" in res.stderr
+    imported = {line.rsplit("|", 1)[-1].strip() for line in res.stderr.splitlines()}
+    assert "asgard.client" in imported
+    assert not imported & {"asgard.app", "argparse", "json", "socket", "tempfile"}
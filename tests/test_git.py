@@ -1,9 +1,10 @@
+import io
 import os
 from tempfile import TemporaryDirectory
 
 import pytest
 
-from asgard.git import GitRepo
+from asgard.git import GitRepo, find_git_dir
 
 
 def test_gitrepo_as_context_manager_leaves_no_residue():
@@ -81,3 +82,195 @@ def test_tagging():
         g.commit("test: test4", allow_empty=True)
         log = g.log()[3]
         assert log["message"] == "test: test4" and "tag" not in log.keys()
+
+
+def test_log_reads_annotated_tags_and_multiline_bodies():
+    with GitRepo() as g:
+        g.commit("feat: a\n\nbody\n\nmore body", allow_empty=True)
+        g.git("tag -a 1.0.0 -m 'release'")
+        g.commit("fix: b", allow_empty=True)
+        log = g.log()
+        assert log[0] == {
+            "hash": log[0]["hash"],
+            "message": "feat: a\n\nbody\n\nmore body",
+            "tag": "1.0.0",
+        }
+        assert log[1]["message"] == "fix: b" and "tag" not in log[1].keys()
+
+
+def test_latest_tag_skips_non_semver_tags():
+    with GitRepo() as g:
+        g.commit("test: test", allow_empty=True)
+        assert g.latest_tag() is None
+        g.tag("v1.0.0")
+        g.commit("test: test2", allow_empty=True)
+        g.tag("not-a-version")
+        tag_hash, tag = g.latest_tag()
+        assert tag == "v1.0.0" and tag_hash == g.log()[0]["hash"]
+
+
+def test_log_since_latest_tag():
+    with GitRepo() as g:
+        g.commit("test: test1", allow_empty=True)
+        assert g.log(since_latest_tag=True) == g.log()
+        g.commit("test: test2", allow_empty=True)
+        g.tag("1.0.0")
+        g.commit("test: test3", allow_empty=True)
+        g.commit("test: test4", allow_empty=True)
+        log = g.log(since_latest_tag=True)
+        assert log == g.log()[1:]
+        assert log[0]["tag"] == "1.0.0"
+
+
+def test_tag_index_peels_annotated_tags_and_keeps_every_tag():
+    with GitRepo() as g:
+        g.commit("test: test", allow_empty=True)
+        g.tag("0.9.0")
+        g.git("tag -a v1.0.0 -m 'annotated'")
+        g.tag("nightly")
+        commit_hash = g.log()[0]["hash"]
+        index = g.tag_index()
+        assert index.tags(commit_hash) == ["v1.0.0", "0.9.0"]
+        assert g.log()[0]["tag"] == "v1.0.0"
+        assert g.latest_tag() == (commit_hash, "v1.0.0")
+
+
+def test_read_object_and_message_share_one_cat_file_process():
+    with GitRepo() as g:
+        g.commit("feat: a\n\nbody", allow_empty=True)
+        g.commit("fix: b", allow_empty=True)
+        log = g.log()
+        assert g.message(log[0]["hash"]) == "feat: a\n\nbody"
+        pid = g._cat_file.proc.pid
+        assert g.message(log[1]["hash"]) == "fix: b"
+        assert g._cat_file.proc.pid == pid
+        obj_type, data = g.read_object("HEAD")
+        assert obj_type == "commit" and data.endswith(b"fix: b\n")
+        assert g.object_info("HEAD") == (log[1]["hash"], "commit", len(data))
+        assert g.read_object("0" * 40) is None
+        assert g.object_info("0" * 40) is None
+
+
+def test_cat_file_session_recovers_when_child_dies():
+    with GitRepo() as g:
+        g.commit("feat: a", allow_empty=True)
+        assert g.message("HEAD") == "feat: a"
+        g._cat_file.proc.kill()
+        g._cat_file.proc.wait()
+        assert g.message("HEAD") == "feat: a"
+
+
+def test_closing_stops_cat_file_sessions():
+    with GitRepo() as g:
+        g.commit("feat: a", allow_empty=True)
+        g.message("HEAD")
+        proc = g._cat_file.proc
+    assert proc.poll() is not None and g._cat_file.proc is None
+
+
+class ChunkedStream(io.RawIOBase):
+    def __init__(self, data, size):
+        self.data, self.size = data, size
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        chunk, self.data = self.data[: self.size], self.data[self.size :]
+        b[: len(chunk)] = chunk
+        return len(chunk)
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 65536])
+def test_split_records_across_chunk_boundaries(size):
+    data = b"\x01h1\x00feat: a\n\x00\x01h2\x00b\x00\npath\x00\x01h3\x00c\n\x00"
+    stream = io.BufferedReader(ChunkedStream(data, size), buffer_size=size)
+    records = [r.rstrip(b"\0") for r in GitRepo._split_records(stream)]
+    assert records == [b"h1\x00feat: a\n", b"h2\x00b\x00\npath", b"h3\x00c\n"]
+
+
+def test_iter_log_streams_newest_first():
+    with GitRepo() as g:
+        for i in range(5):
+            g.commit(f"test: {i}", allow_empty=True)
+        g.tag("1.0.0")
+        log = g.iter_log()
+        assert next(log)["message"] == "test: 4"
+        log.close()
+        assert list(g.iter_log()) == list(reversed(g.log()))
+        assert list(g.iter_log(exclude=g.log()[2]["hash"])) == list(
+            reversed(g.log()[3:])
+        )
+
+
+def test_tags_merged_only_lists_reachable_tags():
+    with GitRepo() as g:
+        g.commit("test: test", allow_empty=True)
+        g.tag("1.0.0")
+        g.git("checkout -q -b other")
+        g.commit("test: other", allow_empty=True)
+        g.tag("2.0.0")
+        g.git("checkout -q -")
+        g.commit("test: main", allow_empty=True)
+        assert [t for _, t in g.tags()] == ["1.0.0", "2.0.0"]
+        assert [t for _, t in g.tags(merged="HEAD")] == ["1.0.0"]
+
+
+def test_find_git_dir_layouts(tmp_path, monkeypatch):
+    monkeypatch.delenv("GIT_DIR", raising=False)
+    with GitRepo() as g:
+        g.commit("test: test", allow_empty=True)
+        git_dir = os.path.join(os.path.abspath(g.repo_path), ".git")
+        os.makedirs(os.path.join(g.repo_path, "sub", "dir"))
+        assert find_git_dir(g.repo_path) == (git_dir, git_dir)
+        assert find_git_dir(os.path.join(g.repo_path, "sub", "dir"))[0] == git_dir
+        with pytest.raises(ValueError):
+            find_git_dir(os.path.join(g.repo_path, "sub"), search_parents=False)
+
+        worktree = str(tmp_path / "worktree")
+        g.git(f"worktree add -q {worktree}")
+        wt_git_dir, common_dir = find_git_dir(worktree)
+        assert common_dir == git_dir
+        assert wt_git_dir == os.path.join(git_dir, "worktrees", "worktree")
+
+        bare = str(tmp_path / "bare.git")
+        g.git(f"clone -q --bare . {bare}")
+        assert find_git_dir(bare) == (bare, bare)
+
+        with pytest.raises(ValueError):
+            find_git_dir(str(tmp_path / "missing"))
+        monkeypatch.setenv("GIT_DIR", bare)
+        assert find_git_dir(str(tmp_path)) == (bare, bare)
+
+
+def test_read_only_open_spawns_no_git_and_refuses_writes(monkeypatch):
+    with GitRepo() as g:
+        g.commit("test: test", allow_empty=True)
+        monkeypatch.setattr(GitRepo, "git", lambda *a, **kw: pytest.fail("git ran"))
+        ro = GitRepo(g.repo_path, read_only=True)
+        assert ro.git_dir() == os.path.join(os.path.abspath(g.repo_path), ".git")
+        monkeypatch.undo()
+        assert ro.log()[0]["message"] == "test: test"
+        for write in (ro.add, lambda: ro.commit("x"), lambda: ro.tag("v1.0.0")):
+            with pytest.raises(PermissionError):
+                write()
+        ro.close()
+    with pytest.raises(FileNotFoundError):
+        GitRepo("/missing", read_only=True)
+
+
+@pytest.mark.parametrize("read_only", [True, False])
+def test_leaving_with_block_keeps_repos_it_did_not_create(read_only):
+    with GitRepo() as g:
+        g.commit("test: test", allow_empty=True)
+        with GitRepo(g.repo_path, read_only=read_only) as opened:
+            assert opened.log()[0]["message"] == "test: test"
+        assert g.log()[0]["message"] == "test: test"
+
+
+def test_open_existing_repo_skips_init(monkeypatch):
+    with GitRepo() as g:
+        calls = []
+        monkeypatch.setattr(GitRepo, "git", lambda self, cmd, *a: calls.append(cmd))
+        GitRepo(g.repo_path)
+        assert calls == []
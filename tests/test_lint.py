@@ -0,0 +1,89 @@
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from asgard.app import main
+from asgard.git import GitRepo
+from asgard.lint import lint
+
+MESSAGES = [
+    "feat: initial commit",
+    "FEAT: shouting",
+    "Merge branch 'topic'",
+    "fix add colon",
+    "fix(parser)!: drop support\n\nBREAKING CHANGE: gone",
+]
+
+
+@pytest.fixture
+def repo():
+    with GitRepo() as g:
+        for message in MESSAGES:
+            g.commit(message, allow_empty=True)
+        yield g
+
+
+def lint_main(g, *args):
+    with pytest.raises(SystemExit) as e:
+        main(["lint", "--repo-path", g.repo_path] + list(args))
+    return e.value.code
+
+
+def test_lint_reports_violations_as_text(repo, capsys):
+    assert lint_main(repo, "HEAD") == 1
+    c = capsys.readouterr()
+    lines = c.out.splitlines()
+    assert [line.split(" ", 1)[1] for line in lines[::2]] == [
+        "type-colon: type (and optional scope or '!') must end with ':'",
+        "type-case: type must not be all uppercase",
+    ]
+    assert lines[1::2] == ["    fix add colon", "    FEAT: shouting"]
+    assert "2 of 5 commits" in c.err
+
+
+def test_lint_json_report(repo, capsys, tmp_path):
+    output = tmp_path / "lint.json"
+    assert (
+        lint_main(repo, "HEAD~3..HEAD", "--format", "json", "--output", str(output))
+        == 1
+    )
+    report = json.loads(output.read_text())
+    assert report["range"] == "HEAD~3..HEAD"
+    assert report["commits"] == 3
+    assert [(v["rule"], v["header"]) for v in report["violations"]] == [
+        ("type-colon", "fix add colon")
+    ]
+    assert report["violations"][0]["hash"] == repo.object_info("HEAD~1")[0]
+
+
+def test_lint_junit_report(repo, capsys):
+    assert lint_main(repo, "HEAD", "--format", "junit") == 1
+    suite = ET.fromstring(capsys.readouterr().out).find("testsuite")
+    assert suite.get("tests") == "5" and suite.get("failures") == "2"
+    failures = [case.find("failure") for case in suite.iter("testcase")]
+    assert [f.get("type") for f in failures if f is not None] == [
+        "type-colon",
+        "type-case",
+    ]
+
+
+def test_lint_passes_clean_ranges(repo, capsys):
+    main(["lint", "--repo-path", repo.repo_path, "HEAD~1..HEAD"])
+    assert capsys.readouterr().out == ""
+
+
+def test_lint_rejects_bad_ranges(repo, capsys):
+    assert lint_main(repo, "nope..HEAD") == 2
+    assert "bad revision range" in capsys.readouterr().err
+
+
+def test_lint_in_parallel_matches_serial():
+    commits = [
+        {"hash": f"{i:040x}", "message": ["feat: a", "WIP", "fix: b"][i % 3]}
+        for i in range(50)
+    ]
+    serial = lint(commits, jobs=1, chunk_size=7)
+    assert serial == lint(commits, jobs=2, chunk_size=7)
+    assert serial[0] == [commit["hash"] for commit in commits]
+    assert [v["hash"] for v in serial[1]] == [c["hash"] for c in commits[1::3]]
@@ -0,0 +1,130 @@
+import pytest
+
+from asgard import app
+from asgard.app import main
+from asgard.git import GitRepo
+from asgard.notes import NOTES_REF, VersionNotes
+
+
+@pytest.fixture
+def classified(monkeypatch):
+    """Records the message of every commit classified."""
+    messages = []
+    classify = app.classify
+
+    def recording_classify(commit, cache=None):
+        messages.append(commit["message"])
+        return classify(commit, cache)
+
+    monkeypatch.setattr(app, "classify", recording_classify)
+    return messages
+
+
+def released_repo(g):
+    g.commit("feat: initial commit", allow_empty=True)
+    g.tag("v1.0.0")
+    g.commit("feat: a", allow_empty=True)
+    g.commit("fix: b", allow_empty=True)
+
+
+def clone(g, remote, path):
+    g.git(f"clone -q {remote} {path}")
+    return GitRepo(str(path))
+
+
+def head_state(g):
+    return VersionNotes(g).get(g.object_info("HEAD")[0])
+
+
+@pytest.mark.parametrize("backend", ["git", "native"])
+def test_main_resumes_from_noted_state(backend, classified, capsys):
+    with GitRepo() as g:
+        released_repo(g)
+        args = ["--repo-path", g.repo_path, "--backend", backend, "--notes"]
+        main(args)
+        assert classified == ["fix: b", "feat: a"]
+        assert head_state(g) == {
+            "tag": "v1.0.0",
+            "traversal": "all",
+            "bump": "minor",
+            "version": "1.1.0",
+        }
+        g.commit("fix: c", allow_empty=True)
+        del classified[:]
+        main(args)
+        assert classified == ["fix: c"]
+        assert head_state(g)["version"] == "1.1.0"
+        # Nothing new: the state is read straight from HEAD's note.
+        del classified[:]
+        main(args)
+        assert classified == []
+    assert capsys.readouterr().out == "1.1.0\n1.1.0\n1.1.0\n"
+
+
+def test_main_resumes_a_breaking_change_without_reading_commits(classified, capsys):
+    with GitRepo() as g:
+        released_repo(g)
+        g.commit("feat!: c", allow_empty=True)
+        main(["--repo-path", g.repo_path, "--notes"])
+        for message in ("fix: d", "fix: e"):
+            g.commit(message, allow_empty=True)
+        del classified[:]
+        main(["--repo-path", g.repo_path, "--notes"])
+        assert classified == []
+    assert capsys.readouterr().out == "2.0.0\n2.0.0\n"
+
+
+def test_main_ignores_notes_from_other_tags_and_traversals(classified, capsys):
+    with GitRepo() as g:
+        released_repo(g)
+        main(["--repo-path", g.repo_path, "--notes", "--traversal", "first-parent"])
+        del classified[:]
+        main(["--repo-path", g.repo_path, "--notes"])
+        assert classified == ["fix: b", "feat: a"]
+        main(["--repo-path", g.repo_path, "--notes", "--tag"])
+        g.commit("fix: c", allow_empty=True)
+        del classified[:]
+        main(["--repo-path", g.repo_path, "--notes"])
+        assert classified == ["fix: c"]
+    assert capsys.readouterr().out == "1.1.0\n1.1.0\n1.1.0\n1.1.1\n"
+
+
+def test_main_notes_read_only(classified, capsys, tmp_path):
+    with GitRepo() as g:
+        released_repo(g)
+        main(["--repo-path", g.repo_path, "--read-only", "--notes"])
+        assert VersionNotes(g).blobs() == {}
+        main(["--repo-path", g.repo_path, "--notes"])
+        g.commit("fix: c", allow_empty=True)
+        del classified[:]
+        main(["--repo-path", g.repo_path, "--read-only", "--notes"])
+        assert classified == ["fix: c"]
+        assert head_state(g) is None
+    assert capsys.readouterr().out == "1.1.0\n1.1.0\n1.1.0\n"
+
+
+def test_notes_are_shared_through_a_bare_remote(classified, capsys, tmp_path):
+    remote = str(tmp_path / "remote.git")
+    with GitRepo() as origin:
+        released_repo(origin)
+        origin.git(f"clone -q --bare . {remote}")
+        first = clone(origin, remote, tmp_path / "first")
+        # The remote has no notes yet.
+        main(["--repo-path", first.repo_path, "--notes-remote", "origin"])
+        first.commit("feat!: c", allow_empty=True)
+        first.git("push -q origin HEAD")
+        first.close()
+
+        second = clone(origin, remote, tmp_path / "second")
+        del classified[:]
+        main(["--repo-path", second.repo_path, "--notes-remote", "origin"])
+        assert classified == ["feat!: c"]
+        second.close()
+        shown = GitRepo(remote, read_only=True)
+        assert shown.git(f"notes --ref={NOTES_REF} show HEAD").stdout == (
+            b"asgard-state 1\ntag v1.0.0\ntraversal all\nbump major\nversion 2.0.0\n"
+        )
+        shown.close()
+    c = capsys.readouterr()
+    assert c.out == "1.1.0\n2.0.0\n"
+    assert "WARNING: Couldn't fetch" in c.err
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from asgard.git import GitRepo, NativeGitRepo
+from asgard.odb import apply_delta
+
+
+def make_history(g, monkeypatch=None):
+    if monkeypatch:
+        monkeypatch.setenv("GIT_COMMITTER_DATE", "2020-01-01T00:00:00Z")
+    for i in range(20):
+        with open(g.repo_path + "/file", "a") as f:
+            f.write(f"line {i} " * 200 + "\n")
+        g.add()
+        g.commit(f"feat: change {i}\n\nbody {i}\nmore body")
+        if i % 5 == 0:
+            g.tag(f"v1.{i}.0")
+    g.git("tag -a 2.0.0 -m 'annotated'")
+    g.commit("fix: after tag", allow_empty=True)
+    if monkeypatch:
+        # The topic branch is newer than the commits it forked from, so the
+        # walk reaches its base before learning that it is excluded.
+        monkeypatch.setenv("GIT_COMMITTER_DATE", "2020-01-01T00:00:01Z")
+    g.git("checkout -q -b topic HEAD~3")
+    g.commit("feat: on topic", allow_empty=True)
+    g.git("checkout -q -")
+    g.git("merge -q --no-ff -m 'chore: merge topic' topic")
+
+
+@pytest.mark.parametrize("fixed_dates", [False, True])
+@pytest.mark.parametrize("packed", [False, True])
+def test_native_log_matches_git_log(packed, fixed_dates, monkeypatch):
+    with GitRepo() as g:
+        make_history(g, monkeypatch if fixed_dates else None)
+        if packed:
+            g.git("gc -q --aggressive")
+            g.git("pack-refs --all")
+        with NativeGitRepo(g.repo_path) as n:
+            assert n.log() == g.log()
+            assert n.log(since_latest_tag=True) == g.log(since_latest_tag=True)
+            assert n.latest_tag() == g.latest_tag()
+            base = g.resolve_commit("v1.5.0")
+            for first_parent in (False, True):
+                hashes = list(g.iter_hashes(exclude=base, first_parent=first_parent))
+                assert hashes == [
+                    commit["hash"]
+                    for commit in g.iter_log(exclude=base, first_parent=first_parent)
+                ]
+                assert (
+                    list(n.iter_hashes(exclude=base, first_parent=first_parent))
+                    == hashes
+                )
+            assert n.git_dir() == g.git_dir()
+            assert n.tag_index().by_commit == g.tag_index().by_commit
+            for commit in g.log():
+                assert n.message(commit["hash"]) == commit["message"]
+            for rev in ("HEAD", "2.0.0", "0" * 40):
+                assert n.read_object(rev) == g.read_object(rev)
+                assert n.object_info(rev) == g.object_info(rev)
+
+
+def test_native_log_on_empty_repo():
+    with GitRepo() as g:
+        with NativeGitRepo(g.repo_path) as n:
+            assert n.log() == () and n.latest_tag() is None
+
+
+def test_apply_delta_copies_and_inserts():
+    # source size 5, target size 8, copy 3 bytes from offset 1, insert "xyzab"
+    delta = bytes([5, 8, 0x90 | 0x01, 1, 3, 5]) + b"xyzab"
+    assert apply_delta(b"hello", delta) == b"ellxyzab"
+
+
+def test_native_changed_paths_match_git():
+    with GitRepo() as g:
+        for path in ("a/x", "a.txt", "b/c/d", "a/y"):
+            os.makedirs(
+                os.path.dirname(os.path.join(g.repo_path, path)) or g.repo_path,
+                exist_ok=True,
+            )
+            with open(os.path.join(g.repo_path, path), "w") as f:
+                f.write(path)
+            g.add()
+            g.commit(f"feat: {path}")
+        g.git("rm -q -r b")
+        g.git("mv a/x a/z")
+        with open(os.path.join(g.repo_path, "b"), "w") as f:
+            f.write("now a file")
+        g.add()
+        g.commit("feat: shuffle files")
+        with NativeGitRepo(g.repo_path) as n:
+            assert n.log(paths=True) == g.log(paths=True)
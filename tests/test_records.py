@@ -0,0 +1,61 @@
+import functools
+
+import pytest
+
+from asgard.app import classify, infer_vnext
+from asgard.cache import ClassificationCache
+from asgard.git import GitRepo
+from asgard.records import CommitLog
+
+
+def make_history(g):
+    g.commit("feat: a", allow_empty=True)
+    g.tag("v0.1.0")
+    g.commit("not conventional\n\nwith a body", allow_empty=True)
+    g.commit("fix(x)!: b\n\nBody.", allow_empty=True)
+    g.commit("fix: c", allow_empty=True)
+
+
+def test_commit_log_columns():
+    log = CommitLog(None)
+    log.append("b" * 40, "fix")
+    log.append("a" * 40, "feat", tag="v1.0.0")
+    log.append("c" * 40, None)
+    assert len(log) == 3
+    assert [c.hash[0] for c in log] == ["c", "a", "b"]
+    assert log[1].tag == "v1.0.0" and log[1]["tag"] == "v1.0.0"
+    assert "tag" in log[1] and "tag" not in log[0]
+    assert log[-1].msg_type == "fix" and log[0].msg_type is None
+    assert log.types == [None, "fix", "feat"]
+    assert [c.hash[0] for c in log[1:]] == ["a", "b"]
+    with pytest.raises(IndexError):
+        log[3]
+    with pytest.raises(KeyError):
+        log[0]["tag"]
+
+
+@pytest.mark.parametrize("since_latest_tag", [False, True])
+def test_compact_log_matches_dict_log(since_latest_tag):
+    with GitRepo() as g:
+        make_history(g)
+        log = g.log(since_latest_tag=since_latest_tag)
+        compact = g.log(since_latest_tag=since_latest_tag, compact=True)
+        assert len(compact) == len(log)
+        for record, commit in zip(log, compact):
+            assert commit.hash == record["hash"]
+            assert commit.get("tag") == record.get("tag")
+            assert commit["message"] == record["message"]
+        assert [c.breaking for c in compact][-2:] == [True, False]
+        assert infer_vnext(compact) == infer_vnext(log) == "1.0.0"
+
+
+def test_compact_log_with_cached_classification(tmp_path):
+    with GitRepo() as g:
+        make_history(g)
+        cache = ClassificationCache(str(tmp_path / "cache"))
+        compact = g.log(compact=True, classify=functools.partial(classify, cache=cache))
+        assert cache.get(compact[-1].hash) == "fix"
+        assert cache.get(compact[1].hash) == cache.invalid
+        assert compact[1].msg_type is None
+        with pytest.raises(ValueError):
+            g.log(compact=True, paths=True)
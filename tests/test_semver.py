@@ -1,3 +1,5 @@
+import time
+
 import pytest
 
 from asgard.semver import SemVer
@@ -268,3 +270,48 @@ def test_increment_suffix_number():
 def test_increment_suffix_number_raises_typeerror_when_none():
     with pytest.raises(TypeError):
         SemVer().increment_suffix_number()
+
+
+def test_ordering_follows_semver_precedence():
+    ordered = [
+        "0.1.0",
+        "0.1.1",
+        "1.0.0-alpha.1",
+        "1.0.0-alpha.2",
+        "1.0.0-alpha.10",
+        "1.0.0-beta.1",
+        "1.0.0-rc.1",
+        "1.0.0",
+        "1.2.0",
+        "10.0.0",
+    ]
+    versions = [SemVer.fromstr(v) for v in ordered]
+    assert sorted(reversed(versions)) == versions
+    assert SemVer.fromstr("1.0.0rc1") < SemVer(1, 0, 0) <= SemVer(1, 0, 0)
+    assert max(versions) == "10.0.0"
+
+
+def test_hash_is_consistent_with_equality():
+    assert len({SemVer(1, 0, 0), SemVer.fromstr("1.0.0"), SemVer(1, 0, 1)}) == 2
+    assert hash(SemVer(1, 0, 0)) == hash("1.0.0")
+
+
+def test_semver_has_no_instance_dict():
+    with pytest.raises(AttributeError):
+        SemVer().extra = 1
+
+
+def test_parse_many():
+    versions = SemVer.parse_many(["1.0.0", "v1.0.0", "2.0.0-rc.1", "nope"])
+    assert versions == ["1.0.0", "2.0.0-rc.1"]
+    with pytest.raises(ValueError):
+        SemVer.parse_many(["1.0.0", "nope"], skip_invalid=False)
+
+
+def test_sorting_and_deduplicating_many_versions_is_fast():
+    strs = [f"{i % 7}.{i % 50}.{i % 13}" for i in range(50_000)]
+    strs += [f"{i % 7}.{i % 50}.{i % 13}-rc.{i % 9 + 1}" for i in range(50_000)]
+    start = time.perf_counter()
+    versions = sorted(set(SemVer.parse_many(strs)))
+    assert time.perf_counter() - start < 5
+    assert versions[0] == "0.0.0-rc.1" and versions[-1] == "6.49.12"
@@ -0,0 +1,45 @@
+import time
+
+from asgard import stats
+
+
+def test_phases_are_exclusive():
+    collected = stats.start()
+    try:
+        with stats.phase("outer"):
+            time.sleep(0.01)
+            with stats.phase("inner"):
+                time.sleep(0.05)
+    finally:
+        stats.stop()
+    assert 0.01 <= collected.phases["outer"] < 0.05
+    assert collected.phases["inner"] >= 0.05
+
+
+def test_timed_iter_charges_iteration_and_closes():
+    closed = []
+
+    def items():
+        try:
+            time.sleep(0.02)
+            yield 1
+            yield 2
+        finally:
+            closed.append(True)
+
+    collected = stats.start()
+    try:
+        it = stats.timed_iter("history", items())
+        assert next(it) == 1
+        it.close()
+    finally:
+        stats.stop()
+    assert closed == [True]
+    assert collected.phases["history"] >= 0.02
+
+
+def test_disabled_collection_is_a_no_op():
+    with stats.phase("outer"):
+        stats.count("commits_examined")
+    items = iter(())
+    assert stats.timed_iter("history", items) is items
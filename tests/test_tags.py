@@ -0,0 +1,32 @@
+from asgard.tags import TagIndex
+
+
+def test_non_semver_tags_are_ignored():
+    index = TagIndex([("a", "latest"), ("b", "v1.0.0"), ("c", "release-1")])
+    assert len(index) == 1
+    assert "a" not in index and "b" in index
+    assert index.tag("a") is None and index.tag("b") == "v1.0.0"
+
+
+def test_commit_with_several_tags_prefers_highest_version():
+    index = TagIndex(
+        [("a", "1.0.0rc1"), ("a", "v1.0.0"), ("a", "0.9.0"), ("a", "1.0.0rc2")]
+    )
+    assert index.tags("a") == ["v1.0.0", "1.0.0rc2", "1.0.0rc1", "0.9.0"]
+    assert index.tag("a") == "v1.0.0"
+
+
+def test_highest_picks_by_version_and_suffix():
+    index = TagIndex(
+        [
+            ("a", "v1.0.0"),
+            ("b", "v1.1.0rc1"),
+            ("c", "v0.9.0"),
+            ("d", "v1.1.0-beta.3"),
+            ("e", "v1.0.1"),
+        ]
+    )
+    assert index.highest() == ("e", "v1.0.1")
+    assert index.highest("rc") == ("b", "v1.1.0rc1")
+    assert index.highest("beta") == ("d", "v1.1.0-beta.3")
+    assert TagIndex().highest() is None
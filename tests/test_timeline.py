@@ -0,0 +1,131 @@
+import pytest
+
+from asgard.app import infer_vnext, main
+from asgard.git import GitRepo
+from asgard.timeline import build_timeline
+
+MESSAGES = [
+    "chore: init",
+    "fix: a",
+    "feat: b",
+    ("fix: c", "v0.1.0"),
+    "docs: d",
+    "not conventional",
+    ("fix: e", "v0.1.1"),
+    "feat!: f",
+    "fix: g",
+    ("feat: h", "v1.0.0rc1"),
+    "fix: i",
+]
+ANNOTATED = {"v0.1.1"}
+
+
+def make_history(g):
+    for message in MESSAGES:
+        tag = None
+        if isinstance(message, tuple):
+            message, tag = message
+        g.commit(message, allow_empty=True)
+        if tag in ANNOTATED:
+            g.git(f"tag -a {tag} -m {tag}")
+        elif tag:
+            g.tag(tag)
+
+
+@pytest.mark.parametrize("suffix", ["", "rc"])
+def test_timeline_matches_per_commit_inference(suffix):
+    with GitRepo() as g:
+        make_history(g)
+        log = g.log()
+        timeline = build_timeline(g.iter_log(parents=True), suffix=suffix)
+    assert len(timeline) == len(log)
+    for i, commit in enumerate(log):
+        expected = infer_vnext(log[: i + 1], suffix=suffix)
+        assert timeline.vnext(commit["hash"]) == str(expected)
+
+
+def test_timeline_release_lookup():
+    with GitRepo() as g:
+        make_history(g)
+        log = g.log()
+        timeline = build_timeline(g.iter_log(parents=True))
+    releases = [timeline.release(commit["hash"]) for commit in log]
+    assert releases == ["v0.1.0"] * 4 + ["v0.1.1"] * 3 + ["v1.0.0rc1"] * 3 + [None]
+    assert log[0]["hash"] in timeline
+    assert "0" * 40 not in timeline
+    with pytest.raises(KeyError):
+        timeline.release("0" * 40)
+
+
+@pytest.mark.parametrize("backend", ["git", "native"])
+def test_main_timeline(backend, capsys):
+    with GitRepo() as g:
+        make_history(g)
+        log = g.log()
+        main(["timeline", "--repo-path", g.repo_path])
+        lines = capsys.readouterr().out.splitlines()
+        assert len(lines) == len(MESSAGES)
+        assert lines[0] == f"{log[0]['hash']} 0.1.0 v0.1.0"
+        assert lines[-1] == f"{log[-1]['hash']} 1.0.1rc1 -"
+        main(
+            ["timeline", "--repo-path", g.repo_path, "--backend", backend]
+            + ["v0.1.1", log[-4]["hash"]]
+        )
+        assert capsys.readouterr().out == (
+            f"v0.1.1 0.1.2 v0.1.1\n{log[-4]['hash']} 1.0.0 v1.0.0rc1\n"
+        )
+        if backend == "git":
+            main(["timeline", "--repo-path", g.repo_path, "HEAD~3"])
+            assert capsys.readouterr().out == "HEAD~3 1.0.0 v1.0.0rc1\n"
+        with pytest.raises(SystemExit):
+            main(["timeline", "--repo-path", g.repo_path, "nope"])
+
+
+def merge_history(g):
+    g.commit("chore: init", allow_empty=True)
+    g.tag("v0.1.0")
+    g.git("checkout -q -b topic")
+    g.git("checkout -q -")
+    g.commit("fix: a", allow_empty=True)
+    g.tag("v0.1.1")
+    g.git("checkout -q topic")
+    g.commit("fix: topic", allow_empty=True)
+    g.commit("feat!: topic", allow_empty=True)
+    g.git("checkout -q -")
+    g.git("merge -q --no-ff --no-edit topic")
+    g.commit("fix: after", allow_empty=True)
+    g.tag("v1.0.0")
+    g.commit("fix: unreleased", allow_empty=True)
+
+
+@pytest.mark.parametrize("backend", ["git", "native"])
+def test_timeline_follows_ancestry_across_merges(backend, capsys):
+    with GitRepo() as g:
+        merge_history(g)
+        revs = ["topic~1", "topic", "HEAD~2", "HEAD~1", "HEAD", "v0.1.1"]
+        hashes = [g.resolve_commit(rev) for rev in revs]
+        main(["timeline", "--repo-path", g.repo_path, "--backend", backend] + hashes)
+        expected = [
+            ("0.1.1", "v1.0.0"),
+            ("1.0.0", "v1.0.0"),
+            ("1.0.0", "v1.0.0"),
+            ("1.0.1", "v1.0.0"),
+            ("1.0.1", "-"),
+            ("0.1.2", "v0.1.1"),
+        ]
+        assert capsys.readouterr().out == "".join(
+            f"{h} {vnext} {release}\n" for h, (vnext, release) in zip(hashes, expected)
+        )
+        # Same as inferring with the topic branch checked out.
+        for rev, (vnext, _) in zip(revs[:2], expected):
+            g.git(f"checkout -q {rev}")
+            main(["--repo-path", g.repo_path, "--backend", backend])
+            assert capsys.readouterr().out == f"{vnext}\n"
+        g.git(f"checkout -q {hashes[4]}")
+        main(["timeline", "--repo-path", g.repo_path, "--backend", backend])
+        lines = capsys.readouterr().out.splitlines()
+    # Parents come before their children.
+    order = [line.split()[0] for line in lines]
+    assert len(order) == 7
+    assert order.index(hashes[0]) < order.index(hashes[1]) < order.index(hashes[2])
+    assert order.index(hashes[5]) < order.index(hashes[2])